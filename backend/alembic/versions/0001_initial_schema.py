@@ -0,0 +1,84 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.String(36), primary_key=True),
+        sa.Column('email', sa.String(255), nullable=False),
+        sa.Column('hashed_password', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('risk_profile', sa.String(20)),
+        sa.Column('objective', sa.String(20)),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('subscription_plan', sa.String(20)),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'symbols',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('ticker', sa.String(20)),
+        sa.Column('name', sa.String(255)),
+        sa.Column('asset_type', sa.String(50)),
+        sa.Column('last_price_date', sa.DateTime()),
+    )
+    op.create_index('ix_symbols_id', 'symbols', ['id'])
+    op.create_index('ix_symbols_ticker', 'symbols', ['ticker'], unique=True)
+
+    op.create_table(
+        'prices',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('symbol_id', sa.Integer(), sa.ForeignKey('symbols.id')),
+        sa.Column('date', sa.DateTime()),
+        sa.Column('close', sa.Float()),
+        sa.Column('volume', sa.BigInteger()),
+    )
+    op.create_index('ix_prices_id', 'prices', ['id'])
+    op.create_index(
+        'ix_prices_symbol_id_date', 'prices', ['symbol_id', 'date'],
+        unique=True, postgresql_include=['close', 'volume'],
+    )
+
+    op.create_table(
+        'calibrations',
+        sa.Column('symbol_id', sa.Integer(), sa.ForeignKey('symbols.id'), primary_key=True),
+        sa.Column('last_price_date', sa.DateTime()),
+        sa.Column('last_close', sa.Float()),
+        sa.Column('n_returns', sa.Integer()),
+        sa.Column('sum_log_return', sa.Float()),
+        sa.Column('sum_sq_log_return', sa.Float()),
+        sa.Column('periods_per_year', sa.Integer()),
+        sa.Column('log_drift', sa.Float()),
+        sa.Column('mu', sa.Float()),
+        sa.Column('sigma', sa.Float()),
+        sa.Column('dividend_yield', sa.Float()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('calibrations')
+    op.drop_index('ix_prices_symbol_id_date', table_name='prices')
+    op.drop_index('ix_prices_id', table_name='prices')
+    op.drop_table('prices')
+    op.drop_index('ix_symbols_ticker', table_name='symbols')
+    op.drop_index('ix_symbols_id', table_name='symbols')
+    op.drop_table('symbols')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
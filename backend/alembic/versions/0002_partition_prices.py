@@ -0,0 +1,100 @@
+"""monthly range partitioning for prices (opt-in)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Only runs when requested:  alembic -x partition_prices=true upgrade head
+Otherwise prices stays a plain table with the (symbol_id, date) index.
+"""
+from alembic import context, op
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def enabled() -> bool:
+    return context.get_x_argument(as_dictionary=True).get('partition_prices', '').lower() in ('1', 'true', 'yes')
+
+
+def upgrade() -> None:
+    if not enabled():
+        return
+
+    # A chave de partição precisa fazer parte da PK e dos índices únicos
+    op.execute("ALTER TABLE prices RENAME TO prices_legacy")
+    op.execute("ALTER INDEX ix_prices_symbol_id_date RENAME TO ix_prices_legacy_symbol_id_date")
+    op.execute("ALTER INDEX ix_prices_id RENAME TO ix_prices_legacy_id")
+    op.execute("ALTER INDEX prices_pkey RENAME TO prices_legacy_pkey")
+    op.execute("""
+        CREATE TABLE prices (
+            id integer NOT NULL DEFAULT nextval('prices_id_seq'),
+            symbol_id integer REFERENCES symbols(id),
+            date timestamp NOT NULL,
+            close double precision,
+            volume bigint,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute("CREATE INDEX ix_prices_id ON prices (id)")
+    op.execute(
+        "CREATE UNIQUE INDEX ix_prices_symbol_id_date ON prices (symbol_id, date) INCLUDE (close, volume)"
+    )
+    op.execute("CREATE TABLE prices_default PARTITION OF prices DEFAULT")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ensure_price_partition(month_start date) RETURNS void AS $$
+        DECLARE
+            start_date date := date_trunc('month', month_start);
+            partition_name text := 'prices_' || to_char(start_date, 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF prices FOR VALUES FROM (%L) TO (%L)',
+                partition_name, start_date, start_date + interval '1 month'
+            );
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        SELECT ensure_price_partition(m::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(date) FROM prices_legacy), now())),
+            date_trunc('month', now()) + interval '12 months',
+            interval '1 month'
+        ) AS m
+    """)
+    op.execute("""
+        INSERT INTO prices (id, symbol_id, date, close, volume)
+        SELECT id, symbol_id, date, close, volume FROM prices_legacy WHERE date IS NOT NULL
+    """)
+    op.execute("DROP TABLE prices_legacy")
+
+
+def downgrade() -> None:
+    if not enabled():
+        return
+
+    op.execute("ALTER TABLE prices RENAME TO prices_partitioned")
+    op.execute("ALTER INDEX ix_prices_symbol_id_date RENAME TO ix_prices_partitioned_symbol_id_date")
+    op.execute("ALTER INDEX ix_prices_id RENAME TO ix_prices_partitioned_id")
+    op.execute("ALTER INDEX prices_pkey RENAME TO prices_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE prices (
+            id integer PRIMARY KEY DEFAULT nextval('prices_id_seq'),
+            symbol_id integer REFERENCES symbols(id),
+            date timestamp,
+            close double precision,
+            volume bigint
+        )
+    """)
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute("CREATE INDEX ix_prices_id ON prices (id)")
+    op.execute(
+        "CREATE UNIQUE INDEX ix_prices_symbol_id_date ON prices (symbol_id, date) INCLUDE (close, volume)"
+    )
+    op.execute("INSERT INTO prices SELECT id, symbol_id, date, close, volume FROM prices_partitioned")
+    op.execute("DROP TABLE prices_partitioned CASCADE")
+    op.execute("DROP FUNCTION IF EXISTS ensure_price_partition(date)")
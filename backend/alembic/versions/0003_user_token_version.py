@@ -0,0 +1,25 @@
+"""token version for users
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Tokens carry the user's token_version ("ver" claim); bumping it revokes
+every token issued before and changes the principal cache key.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
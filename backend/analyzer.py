@@ -1,5 +1,6 @@
 
 import json
+from app.services.screening import FundamentalsUniverse
 
 def calculate_score(asset):
     """
@@ -41,13 +42,10 @@ def analyze_data():
         print("Error: data.json not found.")
         return
 
-    analyzed_assets = []
-    for asset in assets:
-        asset['score'] = calculate_score(asset)
-        analyzed_assets.append(asset)
-    
-    # Sort by score, descending
-    analyzed_assets.sort(key=lambda x: x['score'], reverse=True)
+    # Vectorized engine; calculate_score above remains the scalar reference
+    universe = FundamentalsUniverse(assets)
+    scores = universe.score()
+    analyzed_assets = universe.rows(universe.top_k(scores, len(universe)), scores)
 
     try:
         with open('backend/results.json', 'w', encoding='utf-8') as f:
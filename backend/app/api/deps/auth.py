@@ -1,16 +1,26 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from app.utils.security import decode_access_token
 from app.models.schemas import TokenData
 from app.models.models import User
-from app.models.database import get_db
+from app.models.database import get_async_db
+from app.services.principal_cache import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token", auto_error=False)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    The caller's principal, from the principal cache when possible: on a hit
+    no connection is checked out (the session connects lazily).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
@@ -24,16 +34,33 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
-    except JWTError:
+        version = int(payload.get("ver", 0))
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == token_data.email).first()
-    if user is None:
+    principal = await principal_cache.get(token_data.email, version)
+    if principal is None:
+        user = (await db.execute(select(User).where(User.email == token_data.email))).scalar_one_or_none()
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        await principal_cache.set(principal)
+    # Token emitido antes de uma revogação (token_version incrementado)
+    if principal.token_version != version:
         raise credentials_exception
-    return user
+    return principal
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Usuário inativo")
     return current_user
+
+
+async def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> Optional[Principal]:
+    # Endpoints públicos que personalizam a resposta quando há login
+    if not token:
+        return None
+    return await get_current_user(token, db)
@@ -1,9 +1,9 @@
 from fastapi import Depends, HTTPException, status
-from app.models.models import User
 from app.api.deps.auth import get_current_active_user
+from app.services.principal_cache import Principal
 
 
-def require_pro_plan(current_user: User = Depends(get_current_active_user)) -> User:
+def require_pro_plan(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     if current_user.subscription_plan != "pro":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -12,6 +12,6 @@ def require_pro_plan(current_user: User = Depends(get_current_active_user)) -> U
     return current_user
 
 
-def check_free_tier_limit(current_user: User = Depends(get_current_active_user)) -> User:
+def check_free_tier_limit(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     # Placeholder para futuras regras de limite de uso
     return current_user
@@ -1,26 +1,46 @@
 from datetime import timedelta
+from typing import Awaitable, TypeVar
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.models import User
 from app.models.schemas import UserCreate, UserInDB, Token
-from app.utils.security import verify_password, get_password_hash, create_access_token
+from app.utils.security import create_access_token
 from app.config import settings
 from app.api.deps.auth import get_current_active_user
+from app.services.password_hasher import HasherBusyError, password_hasher
+from app.services.principal_cache import Principal
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def hashing(call: Awaitable[T]) -> T:
+    try:
+        return await call
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas requisições de autenticação; tente novamente em instantes",
+            headers={"Retry-After": "1"},
+        )
+
 
 @router.post("/register", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user_in.email).first()
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(User).where(User.email == user_in.email))).scalar_one_or_none()
     if db_user:
         raise HTTPException(status_code=400, detail="Email já registrado")
+    # Devolve a conexão ao pool enquanto o hash espera um worker
+    await db.commit()
 
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await hashing(password_hasher.hash(user_in.password))
     db_user = User(
         email=user_in.email,
         hashed_password=hashed_password,
@@ -28,26 +48,40 @@ def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
         objective=user_in.objective,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Cadastro concorrente com o mesmo email venceu a corrida
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email já registrado")
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalar_one_or_none()
+    # Devolve a conexão ao pool enquanto a verificação espera um worker
+    await db.commit()
+    valid, new_hash = (False, None)
+    if user is not None:
+        valid, new_hash = await hashing(password_hasher.verify(form_data.password, user.hashed_password))
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais incorretas",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash is not None:
+        # Hash com outro custo (BCRYPT_ROUNDS mudou): refeito de forma transparente
+        user.hashed_password = new_hash
+        await db.commit()
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "ver": user.token_version or 0}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token,
@@ -57,5 +91,11 @@ def login_for_access_token(
 
 
 @router.get("/me", response_model=UserInDB)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
+async def read_users_me(
+    current_user: Principal = Depends(get_current_active_user), db: AsyncSession = Depends(get_async_db)
+):
+    # O perfil completo (created_at etc.) não fica no cache de principal
+    user = await db.get(User, current_user.user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return user
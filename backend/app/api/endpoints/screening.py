@@ -0,0 +1,194 @@
+import asyncio
+from dataclasses import fields, replace
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import SQLAlchemyError
+from app.api.deps.auth import get_optional_user
+from app.models.database import SessionLocal
+from app.models.schemas import BacktestInput
+from app.repositories.price_repository import PriceRepository
+from app.services.backtest import REBALANCE_MONTHS, BacktestSpec, run_backtest
+from app.services.cache import ANALYTICS, quote_cache
+from app.services.principal_cache import Principal
+from app.services.ranking import ranking_service
+from app.services.screening import ScoreWeights, ScreenFilters, get_universe
+from app.services.scoring_profiles import DEFAULT_PROFILE, PROFILES, resolve_profile
+from app.services.streaming import MEDIA_TYPES, stream_rows
+
+router = APIRouter()
+
+
+@router.get("/")
+def screen_assets(
+    limit: int = Query(20, ge=1, le=500),
+    setor: Optional[str] = None,
+    tipo: Optional[str] = None,
+    min_dy: Optional[float] = None,
+    max_pl: Optional[float] = None,
+    min_roe: Optional[float] = None,
+    max_p_vpa: Optional[float] = None,
+    min_liquidez: Optional[float] = None,
+    max_volatilidade: Optional[float] = None,
+    w_pl: float = 20.0,
+    w_roe: float = 80.0,
+    w_dy: float = 100.0,
+    w_dy_stock: float = 0.0,
+    w_p_vpa: float = 0.0,
+    w_volatilidade: float = 0.0,
+):
+    """
+    Ranks the asset universe by the analyzer score. When the weights match a
+    scoring profile and there are no filters its maintained ranking is read
+    directly; custom screens are applied to the whole universe at once and
+    only the top `limit` are sorted.
+    """
+    if tipo not in (None, "acao", "fii"):
+        raise HTTPException(status_code=400, detail="Tipo deve ser 'acao' ou 'fii'")
+
+    weights = ScoreWeights(
+        pl=w_pl, roe=w_roe, dy=w_dy, dy_stock=w_dy_stock,
+        p_vpa=w_p_vpa, volatilidade=w_volatilidade,
+    )
+    filters = ScreenFilters(
+        setor=setor, tipo=tipo, min_dy=min_dy, max_pl=max_pl, min_roe=min_roe,
+        max_p_vpa=max_p_vpa, min_liquidez=min_liquidez, max_volatilidade=max_volatilidade,
+    )
+    profile = ranking_service.profile_for(weights)
+    if profile is not None and filters == ScreenFilters():
+        result = {"total": ranking_service.size(), "results": ranking_service.top(limit, profile=profile)}
+    else:
+        result = get_universe().screen(weights, filters, limit)
+    result["weights"] = weights.as_dict()
+    return result
+
+
+def check_profile(profile: Optional[str]) -> Optional[str]:
+    """
+    The profile name as stored (case-insensitive, like resolve_profile), or
+    a 400 when it does not exist.
+    """
+    if profile is None:
+        return None
+    name = profile.lower()
+    if name not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Perfil deve ser um de: {', '.join(PROFILES)}",
+        )
+    return name
+
+
+@router.get("/profiles")
+def list_profiles():
+    return [
+        {"name": p.name, "label": p.label, "weights": p.weights.as_dict()}
+        for p in PROFILES.values()
+    ]
+
+
+@router.get("/recommendations")
+def get_recommendations(
+    profile: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Optional[Principal] = Depends(get_optional_user),
+):
+    """
+    Top assets for a scoring profile: `profile` if given, otherwise the one
+    matching the logged user's objective / risk profile. Served from the
+    precomputed ranking of that profile.
+    """
+    profile = check_profile(profile)
+    resolved = resolve_profile(
+        profile,
+        risk_profile=current_user.risk_profile if current_user else None,
+        objective=current_user.objective if current_user else None,
+    )
+    return {
+        "profile": resolved.name,
+        "label": resolved.label,
+        "results": ranking_service.top(limit, profile=resolved.name),
+    }
+
+
+@router.get("/export")
+def export_ranking(profile: Optional[str] = None, format: str = "ndjson"):
+    """
+    Streams the full ranking of a profile as NDJSON or Server-Sent Events,
+    best asset first.
+    """
+    profile = check_profile(profile)
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Formato deve ser 'ndjson' ou 'sse'")
+    return stream_rows(ranking_service.iter_rows(profile or DEFAULT_PROFILE), format)
+
+
+@router.get("/rank/{ticker}")
+def get_rank(ticker: str, profile: Optional[str] = None):
+    profile = check_profile(profile) or DEFAULT_PROFILE
+    ticker = ticker.strip().upper().replace(".SA", "")
+    position = ranking_service.rank(ticker, profile)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Ativo fora do ranking")
+    return {"ticker": ticker, "profile": profile, "rank": position, "total": ranking_service.size()}
+
+
+def price_data_version() -> Optional[str]:
+    with SessionLocal() as db:
+        try:
+            last = PriceRepository.last_ingested(db)
+        except SQLAlchemyError:
+            return None
+    return last.isoformat() if last else None
+
+
+def backtest_with_db(spec: BacktestSpec) -> Dict:
+    with SessionLocal() as db:
+        try:
+            return run_backtest(spec, db)
+        except SQLAlchemyError:
+            db.rollback()
+    # Sem banco: histórico mensal do data.json
+    return run_backtest(spec)
+
+
+@router.post("/backtest")
+async def backtest(spec_in: BacktestInput):
+    """
+    Backtests the ranking strategy: a top-N portfolio by score, rebalanced
+    monthly / quarterly / semiannual / yearly over stored price history,
+    with returns, drawdown and turnover against the equal-weighted
+    universe. Results are cached by strategy + window + last ingested bar.
+    """
+    profile = check_profile(spec_in.profile) or DEFAULT_PROFILE
+    if spec_in.rebalance not in REBALANCE_MONTHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Rebalanceamento deve ser um de: {', '.join(REBALANCE_MONTHS)}",
+        )
+    if spec_in.tipo not in (None, "acao", "fii"):
+        raise HTTPException(status_code=400, detail="Tipo deve ser 'acao' ou 'fii'")
+    weights = PROFILES[profile].weights
+    if spec_in.weights:
+        unknown = set(spec_in.weights) - {f.name for f in fields(weights)}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Pesos desconhecidos: {', '.join(sorted(unknown))}")
+        weights = replace(weights, **spec_in.weights)
+
+    spec = BacktestSpec(
+        weights=weights, top_n=spec_in.top_n, rebalance=spec_in.rebalance,
+        start=spec_in.start, end=spec_in.end, cost_bps=spec_in.cost_bps, tipo=spec_in.tipo,
+        data_as_of=await asyncio.to_thread(price_data_version),
+    )
+    result = await quote_cache.get_or_load(
+        f"backtest:{spec.digest()}", lambda: asyncio.to_thread(backtest_with_db, spec), ANALYTICS,
+    )
+    return {
+        "strategy": {
+            "weights": weights.as_dict(),
+            "top_n": spec.top_n,
+            "rebalance": spec.rebalance,
+            "cost_bps": spec.cost_bps,
+            "tipo": spec.tipo,
+        },
+        **result,
+    }
@@ -0,0 +1,221 @@
+import hashlib
+import json
+from datetime import date, timedelta
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.database import get_db
+from app.models.schemas import (
+    PortfolioSimulatorInput, PortfolioSimulatorResult, SimulatorInput, SimulatorResult,
+)
+from app.services.calibration_service import CalibrationService
+from app.services.simulator_service import (
+    deterministic_years, grid_axis, sensitivity_grid_json, simulate_portfolio_time_to_target,
+    simulate_time_to_target,
+)
+
+router = APIRouter()
+
+
+@router.post("/run", response_model=SimulatorResult)
+def run_simulation(sim_in: SimulatorInput, db: Session = Depends(get_db)):
+    """
+    Time-to-target simulation for reaching `profit_target` over
+    `initial_investment`:
+    - montecarlo: vectorized GBM paths, reports p10/p50/p90 months
+    - deterministic: closed form ln(1 + L/I0) / ln(1 + g + y)
+
+    Parameters left empty are filled from the ticker's stored calibration.
+    """
+    if sim_in.method not in ("montecarlo", "deterministic"):
+        raise HTTPException(status_code=400, detail="Método deve ser 'montecarlo' ou 'deterministic'")
+    if sim_in.n_paths > settings.SIMULATOR_MAX_PATHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.SIMULATOR_MAX_PATHS} caminhos por simulação",
+        )
+
+    mu = sim_in.mu
+    sigma = sim_in.sigma
+    dividend_yield = sim_in.dividend_yield
+    calibration = None
+    if mu is None or sigma is None or dividend_yield is None:
+        try:
+            calibration = CalibrationService.get_parameters(db, sim_in.ticker)
+        except SQLAlchemyError:
+            db.rollback()
+            calibration = CalibrationService.from_local_history(sim_in.ticker)
+    if calibration:
+        mu = calibration["mu"] if mu is None else mu
+        sigma = calibration["sigma"] if sigma is None else sigma
+        dividend_yield = calibration["dividend_yield"] if dividend_yield is None else dividend_yield
+    dividend_yield = dividend_yield or 0.0
+
+    assumptions = {
+        "mu": mu,
+        "sigma": sigma,
+        "dividend_yield": dividend_yield,
+        "horizon_years": sim_in.horizon_years,
+        "calibration": calibration,
+    }
+    result = SimulatorResult(
+        ticker=sim_in.ticker.upper(),
+        initial_investment=sim_in.initial_investment,
+        profit_target=sim_in.profit_target,
+        method=sim_in.method,
+        reinvest_dividends=sim_in.reinvest_dividends,
+        assumptions=assumptions,
+    )
+
+    if mu is None or (sim_in.method == "montecarlo" and sigma is None):
+        result.error = "Sem histórico para calibrar o ativo; informe mu e sigma."
+        return result
+
+    if sim_in.method == "deterministic":
+        years = float(deterministic_years(
+            mu, dividend_yield, sim_in.profit_target / sim_in.initial_investment, sim_in.reinvest_dividends
+        ))
+        if years != years:  # NaN
+            result.error = "Parâmetros inválidos (verifique g, y e L/I0)."
+        else:
+            result.p50_months = years * 12
+        return result
+
+    summary = simulate_time_to_target(
+        initial_investment=sim_in.initial_investment,
+        profit_target=sim_in.profit_target,
+        mu=mu,
+        sigma=sigma,
+        dividend_yield=dividend_yield,
+        reinvest=sim_in.reinvest_dividends,
+        n_paths=sim_in.n_paths,
+        horizon_years=sim_in.horizon_years,
+        seed=sim_in.seed,
+        antithetic=sim_in.antithetic,
+    )
+    result.assumptions.update(n_paths=sim_in.n_paths, seed=sim_in.seed, antithetic=sim_in.antithetic)
+    for name, value in summary.items():
+        setattr(result, name, value)
+    if summary["p90_months"] is None:
+        result.warning = "Parte dos caminhos não atinge a meta no horizonte simulado."
+    return result
+
+
+@router.post("/portfolio", response_model=PortfolioSimulatorResult)
+def run_portfolio_simulation(sim_in: PortfolioSimulatorInput, db: Session = Depends(get_db)):
+    """
+    Time-to-target for a combined position (e.g. a watchlist): every asset
+    follows a GBM whose shocks are correlated through the covariance of the
+    stored price history, and the target is reached when the buy-and-hold
+    portfolio grows by `profit_target` over the sum of the amounts.
+    """
+    amounts = {}
+    for position in sim_in.positions:
+        ticker = position.ticker.strip().upper().replace(".SA", "")
+        amounts[ticker] = amounts.get(ticker, 0.0) + position.amount
+    tickers = list(amounts)
+    if len(tickers) > settings.SIMULATOR_MAX_ASSETS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {settings.SIMULATOR_MAX_ASSETS} ativos por carteira")
+    # O custo cresce com caminhos x ativos
+    if sim_in.n_paths * len(tickers) > settings.SIMULATOR_MAX_PATHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Caminhos x ativos deve ser no máximo {settings.SIMULATOR_MAX_PATHS}",
+        )
+
+    start = date.today() - timedelta(days=round(365.25 * sim_in.lookback_years))
+    try:
+        params = CalibrationService.portfolio_parameters(db, tickers, start=start)
+    except SQLAlchemyError:
+        db.rollback()
+        params = CalibrationService.portfolio_parameters(None, tickers, start=start)
+
+    initial_investment = sum(amounts.values())
+    result = PortfolioSimulatorResult(
+        tickers=tickers,
+        initial_investment=initial_investment,
+        profit_target=sim_in.profit_target,
+        reinvest_dividends=sim_in.reinvest_dividends,
+        assumptions={"lookback_years": sim_in.lookback_years},
+    )
+    if params is None:
+        result.error = "Histórico em comum insuficiente para estimar a covariância da carteira."
+        return result
+    if params.get("missing"):
+        result.error = f"Sem histórico para: {', '.join(params['missing'])}"
+        return result
+
+    order = [amounts[t] for t in params["tickers"]]
+    summary = simulate_portfolio_time_to_target(
+        amounts=np.array(order),
+        profit_target=sim_in.profit_target,
+        mu=params["mu"],
+        cov=params["cov"],
+        dividend_yield=params["dividend_yield"],
+        reinvest=sim_in.reinvest_dividends,
+        n_paths=sim_in.n_paths,
+        horizon_years=sim_in.horizon_years,
+        seed=sim_in.seed,
+        antithetic=sim_in.antithetic,
+    )
+    sigma = np.sqrt(np.diag(params["cov"]))
+    # Ativo sem variância (histórico plano) não tem correlação definida: 0, e 1 na diagonal
+    scale = np.outer(sigma, sigma)
+    correlation = np.divide(params["cov"], scale, out=np.zeros_like(scale), where=scale > 0)
+    np.fill_diagonal(correlation, 1.0)
+    result.assumptions.update(
+        weights=dict(zip(params["tickers"], (np.array(order) / initial_investment).round(4).tolist())),
+        mu=dict(zip(params["tickers"], params["mu"].round(4).tolist())),
+        sigma=dict(zip(params["tickers"], sigma.round(4).tolist())),
+        dividend_yield=dict(zip(params["tickers"], params["dividend_yield"].round(4).tolist())),
+        correlation=np.round(correlation, 3).tolist(),
+        n_returns=params["n_returns"],
+        as_of=params["as_of"],
+        horizon_years=sim_in.horizon_years,
+        n_paths=sim_in.n_paths,
+        seed=sim_in.seed,
+        antithetic=sim_in.antithetic,
+    )
+    for name, value in summary.items():
+        setattr(result, name, value)
+    if summary["p90_months"] is None:
+        result.warning = "Parte dos caminhos não atinge a meta no horizonte simulado."
+    return result
+
+
+@router.get("/sensitivity")
+def sensitivity(
+    request: Request,
+    g: str,
+    y: str = "0",
+    target_ratio: str = "1",
+    reinvest: str = "true",
+):
+    """
+    Deterministic time to target (years) over a whole grid of growth `g`,
+    dividend yield `y`, `target_ratio` (L/I0) and `reinvest`, in one call.
+    Each axis takes comma-separated values and/or inclusive ranges
+    "start:stop:step" (decimals: g=0.04:0.15:0.01). The response is one
+    (reinvest, target_ratio, y, g) matrix for heatmaps; it depends only on
+    the query, so it carries an ETag and long-lived Cache-Control.
+    """
+    try:
+        axes = tuple(grid_axis(text, settings.SENSITIVITY_MAX_AXIS_POINTS) for text in (g, y, target_ratio))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Grade inválida: {exc}")
+    flags = {part.strip().lower() for part in reinvest.split(",")}
+    if not flags or not flags <= {"true", "false"}:
+        raise HTTPException(status_code=400, detail="reinvest deve ser 'true', 'false' ou 'true,false'")
+    reinvest_axis = tuple(flag == "true" for flag in sorted(flags, reverse=True))
+    cells = len(reinvest_axis) * np.prod([len(axis) for axis in axes])
+    if cells > settings.SENSITIVITY_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {settings.SENSITIVITY_MAX_CELLS} células por grade")
+
+    spec = json.dumps([*axes, reinvest_axis])
+    etag = '"' + hashlib.sha256(spec.encode()).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(sensitivity_grid_json(*axes, reinvest_axis), media_type="application/json", headers=headers)
@@ -1,123 +1,291 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.models.database import get_db
-from app.services.yahoo_service import YahooService
-from app.services.investidor10_service import Investidor10Service
-from app.services.status_invest_service import StatusInvestService
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+import numpy as np
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.database import SessionLocal, get_async_db
+from app.models.schemas import QuoteBatchRequest
+from app.repositories.price_repository import PriceRepository
+from app.repositories.symbol_repository import SymbolRepository
+from app.services.price_feed import price_feed
+from app.services.price_store import price_store
+from app.services.quote_aggregator import QuoteAggregator, normalize_ticker
+from app.services.search_index import SearchEntry, search_index
+from app.services.streaming import MEDIA_TYPES, decode_cursor, dumps, encode_cursor, stream_rows
 
 router = APIRouter()
 
+# Ticker completo da B3: quatro letras e o número da classe (PETR4, TAEE11)
+TICKER_PATTERN = re.compile(r"^[A-Z]{4}\d{1,2}[A-Z]?$")
+
+def parse_cursor(cursor: Optional[str], key: str, convert: Callable[[str], Any] = str) -> Any:
+    """
+    The `key` value of a keyset cursor, passed through `convert`. Missing
+    keys, non-string values and values `convert` rejects are a 400.
+    """
+    try:
+        after = decode_cursor(cursor)
+        if after is None:
+            return None
+        value = after[key]
+        if not isinstance(value, str):
+            raise ValueError(key)
+        return convert(value)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def check_format(fmt: str) -> None:
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Formato deve ser 'ndjson' ou 'sse'")
+
+def day_start(value: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(value, datetime.min.time()) if value is not None else None
+
+async def symbol_id_or_404(db: AsyncSession, ticker: str) -> int:
+    symbol_id = await PriceRepository.symbol_id_async(db, ticker)
+    if symbol_id is None:
+        raise HTTPException(status_code=404, detail="Ativo não encontrado")
+    return symbol_id
+
+@router.get("/")
+async def list_symbols(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    asset_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Symbols ordered by ticker, one keyset page at a time. Pass
+    `next_cursor` back as `cursor` to read the following page.
+    """
+    after = parse_cursor(cursor, "ticker")
+    items = await SymbolRepository.page_async(db, after, limit, asset_type)
+    next_cursor = encode_cursor({"ticker": items[-1]["ticker"]}) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_symbols(
+    format: str = "ndjson",
+    asset_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Streams every symbol as NDJSON or Server-Sent Events.
+    """
+    check_format(format)
+    rows = SymbolRepository.iter_all_async(db, settings.EXPORT_BATCH_SIZE, asset_type)
+    return stream_rows(rows, format)
+
 @router.get("/quote/{ticker}")
-def get_quote(ticker: str, db: Session = Depends(get_db)):
+async def get_quote(ticker: str):
     """
     Get consolidated quote data from multiple sources:
     - Yahoo Finance (price, currency, market cap)
     - Investidor10 (fundamentals, ratings)
     - Status Invest (detailed metrics, analyst recommendations)
+
+    Sources are queried concurrently; those that miss the deadline are
+    listed in `missing_sources` and the remaining data is returned.
+    """
+    return await QuoteAggregator.get_quote(ticker)
+
+@router.post("/quotes")
+async def get_quotes(batch: QuoteBatchRequest):
+    """
+    Get consolidated quotes for many tickers in a single round trip.
+    Yahoo prices come from one multi-ticker download; tickers that no
+    source answered for are listed in `missing`.
     """
-    # Normalizar ticker
-    if not ticker.endswith('.SA'):
-        ticker_sa = f"{ticker}.SA"
-    else:
-        ticker_sa = ticker
-    ticker_clean = ticker.replace('.SA', '')
-    
-    # Fetch from all sources
-    yahoo_data = YahooService.get_quote(ticker_clean)
-    investidor10_data = Investidor10Service.get_stock_data(ticker_clean)
-    status_invest_data = StatusInvestService.get_stock_data(ticker_clean)
-    
-    # Consolidar preço (prioridade: Yahoo > Status > Investidor10)
-    price = None
-    if yahoo_data and yahoo_data.get('price'):
-        price = yahoo_data['price']
-    elif status_invest_data and status_invest_data.get('price'):
-        price = status_invest_data['price']
-    elif investidor10_data and investidor10_data.get('price'):
-        price = investidor10_data['price']
-    
-    # Consolidar dividend yield
-    dividend_yield = None
-    if yahoo_data and yahoo_data.get('dividend_yield'):
-        dividend_yield = yahoo_data['dividend_yield']
-    elif investidor10_data and investidor10_data.get('dividend_yield'):
-        dividend_yield = investidor10_data['dividend_yield']
-    elif status_invest_data and status_invest_data.get('dividend_yield'):
-        dividend_yield = status_invest_data['dividend_yield']
-    
-    # Calcular variação percentual (se disponível)
-    change_percent = None
-    if yahoo_data and 'change_percent' in yahoo_data:
-        change_percent = yahoo_data['change_percent']
-    
-    consolidated = {
-        "ticker": ticker_clean,
-        "price": price,
-        "change_percent": change_percent,
-        "dividend_yield": dividend_yield,
-        "currency": yahoo_data.get('currency') if yahoo_data else 'BRL',
-        "yahoo": yahoo_data,
-        "investidor10": investidor10_data,
-        "status_invest": status_invest_data,
-        "links": {
-            "google_finance": f"https://www.google.com/finance/quote/{ticker_clean}:BVMF",
-            "yahoo_finance": f"https://finance.yahoo.com/quote/{ticker_sa}",
-            "investidor10": f"https://www.investidor10.com.br/acoes/{ticker_clean}/",
-            "status_invest": f"https://www.statusinvest.com.br/acoes/{ticker_clean}"
-        }
+    if len(batch.tickers) > settings.QUOTE_BATCH_MAX_TICKERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.QUOTE_BATCH_MAX_TICKERS} tickers por requisição",
+        )
+    return await QuoteAggregator.get_quotes(batch.tickers)
+
+def feed_tickers(tickers) -> list:
+    tickers = sorted({t.strip().upper().replace(".SA", "") for t in tickers if t and t.strip()})
+    return tickers[:settings.QUOTE_BATCH_MAX_TICKERS]
+
+@router.websocket("/ws")
+async def price_socket(websocket: WebSocket):
+    """
+    Live prices. Clients send {"action": "subscribe" | "unsubscribe",
+    "tickers": [...]} and receive one {"type": "quote", ...} message per
+    price change of their tickers.
+    """
+    await websocket.accept()
+    queue = price_feed.new_queue()
+    watched = set()
+
+    async def forward():
+        # Única tarefa que escreve no socket: cotações, snapshot e erros passam pela fila
+        while True:
+            message = await queue.get()
+            await websocket.send_json(message if "type" in message else {"type": "quote", **message})
+
+    def reject():
+        price_feed.offer(queue, {"type": "error", "detail": "Mensagem inválida"})
+
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                reject()
+                continue
+            if not isinstance(message, dict) or not isinstance(message.get("tickers") or [], list):
+                reject()
+                continue
+            tickers = feed_tickers(t for t in message.get("tickers") or [] if isinstance(t, str))
+            if message.get("action") == "unsubscribe":
+                price_feed.unsubscribe(queue, tickers)
+                watched.difference_update(tickers)
+                continue
+            tickers = [t for t in tickers if t not in watched][:settings.QUOTE_BATCH_MAX_TICKERS - len(watched)]
+            watched.update(tickers)
+            for quote in price_feed.subscribe(queue, tickers):
+                price_feed.offer(queue, quote)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        price_feed.unsubscribe(queue, watched)
+
+@router.get("/stream")
+async def price_events(tickers: str):
+    """
+    Server-Sent Events alternative to /ws for `tickers=PETR4,VALE3`.
+    """
+    tickers = feed_tickers(tickers.split(","))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="Informe ao menos um ticker")
+    queue = price_feed.new_queue()
+
+    async def events():
+        try:
+            for quote in price_feed.subscribe(queue, tickers):
+                yield f"data: {dumps(quote)}\n\n"
+            while True:
+                try:
+                    quote = await asyncio.wait_for(queue.get(), timeout=settings.PRICE_FEED_INTERVAL_SECONDS * 2)
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém a conexão viva atrás de proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {dumps(quote)}\n\n"
+        finally:
+            price_feed.unsubscribe(queue, tickers)
+
+    return StreamingResponse(events(), media_type=MEDIA_TYPES["sse"], headers={"Cache-Control": "no-cache"})
+
+@router.get("/history/{ticker}")
+async def get_history(
+    ticker: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Close/volume history for charts, served from the columnar price store.
+    """
+    try:
+        # A sessão só abre conexão quando o ticker não está no store
+        series = await db.run_sync(lambda session: price_store.window(ticker, start, end, db=session))
+    except (SQLAlchemyError, OSError):
+        # asyncpg não embrulha falhas de conexão em SQLAlchemyError
+        await db.rollback()
+        series = price_store.window(ticker, start, end)
+    if series is None:
+        raise HTTPException(status_code=404, detail="Histórico não encontrado")
+    return {
+        "ticker": ticker.upper().replace(".SA", ""),
+        "dates": np.datetime_as_string(series.dates, unit="D").tolist(),
+        "close": series.close.tolist(),
+        "volume": series.volume.tolist(),
     }
-    
-    if not any([yahoo_data, investidor10_data, status_invest_data]):
-        return {"error": "Quote not found in any source", "ticker": ticker_clean}
-    
-    return consolidated
+
+@router.get("/history/{ticker}/prices")
+async def get_price_page(
+    ticker: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Daily bars from the prices table, one keyset page (by date) at a time.
+    """
+    after_date = parse_cursor(cursor, "date", datetime.fromisoformat)
+    symbol_id = await symbol_id_or_404(db, ticker)
+    items = await PriceRepository.page_async(db, symbol_id, after_date, limit, day_start(start), day_start(end))
+    next_cursor = encode_cursor({"date": items[-1]["date"]}) if len(items) == limit else None
+    return {"ticker": ticker.upper().replace(".SA", ""), "items": items, "next_cursor": next_cursor}
+
+@router.get("/history/{ticker}/export")
+async def export_prices(
+    ticker: str,
+    format: str = "ndjson",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Streams a ticker's full daily history as NDJSON or Server-Sent Events,
+    reading the prices table in keyset batches.
+    """
+    check_format(format)
+    symbol_id = await symbol_id_or_404(db, ticker)
+    rows = PriceRepository.iter_prices_async(db, symbol_id, settings.EXPORT_BATCH_SIZE, day_start(start), day_start(end))
+    return stream_rows(rows, format)
+
+def reload_search_index() -> None:
+    # Recarga rara (SEARCH_INDEX_RELOAD_SECONDS) e pesada em CPU: fica numa thread
+    with SessionLocal() as db:
+        search_index.load(db)
+
+def looks_like_ticker(query: str) -> bool:
+    return bool(TICKER_PATTERN.match(normalize_ticker(query)))
 
 @router.get("/search")
-def search(q: str, db: Session = Depends(get_db)):
-    """
-    Search stocks across multiple sources
-    """
-    yahoo_results = YahooService.search_tickers(q)
-    investidor10_results = Investidor10Service.search_stocks(q)
-    status_invest_results = StatusInvestService.search_stocks(q)
-    
-    # Combine and deduplicate results
-    all_results = []
-    seen_tickers = set()
-    
-    for results in [yahoo_results, investidor10_results, status_invest_results]:
-        if results:
-            for result in results:
-                ticker = result.get("ticker", "").upper()
-                if ticker and ticker not in seen_tickers:
-                    seen_tickers.add(ticker)
-                    all_results.append(result)
-    
-    return {"results": all_results}
+async def search(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    backfill: Optional[bool] = None,
+):
+    """
+    Autocomplete from the local index of tickers, company names and
+    sectors (prefix and typo tolerant), without network calls. A complete
+    ticker (e.g. PETR4) the index cannot answer falls through to the remote
+    providers, and what they find is added to the index; `backfill=true`
+    does the same for any query and `backfill=false` never does, so
+    search-as-you-type prefixes stay local.
+    """
+    await search_index.ensure_fresh(reload_search_index, settings.SEARCH_INDEX_RELOAD_SECONDS)
+    results = search_index.search(q, limit)
+    if backfill is None:
+        backfill = looks_like_ticker(q)
+    if not results and backfill:
+        results = await QuoteAggregator.search(q)
+        for result in results:
+            search_index.add(SearchEntry(
+                normalize_ticker(result["ticker"]), result.get("name"), asset_type=result.get("type"),
+            ))
+        results = results[:limit]
+    return {"results": results}
 
 @router.get("/fii/{ticker}")
-def get_fii(ticker: str, db: Session = Depends(get_db)):
+async def get_fii(ticker: str):
     """
     Get FII (Fundo de Investimento Imobiliário) data from multiple sources
     """
-    investidor10_data = Investidor10Service.get_fii_data(ticker)
-    status_invest_data = StatusInvestService.get_fii_data(ticker)
-    
-    consolidated = {
-        "ticker": ticker,
-        "type": "FII",
-        "sources": {
-            "investidor10": investidor10_data,
-            "status_invest": status_invest_data,
-        },
-        "links": {
-            "google_finance": f"https://www.google.com/finance/quote/{ticker.replace('.SA', '')}:BVMF",
-            "investidor10": f"https://www.investidor10.com.br/fiis/{ticker.replace('.SA', '')}/",
-            "status_invest": f"https://www.statusinvest.com.br/fiis/{ticker.replace('.SA', '')}"
-        }
-    }
-    
-    if not any([investidor10_data, status_invest_data]):
-        return {"error": "FII not found"}
-    
-    return consolidated
+    return await QuoteAggregator.get_fii(ticker)
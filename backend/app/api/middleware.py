@@ -0,0 +1,67 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    REQUEST_LATENCY,
+    REQUESTS_IN_PROGRESS,
+    request_db_stats,
+)
+from app.utils.tracing import REQUEST_ID_HEADER, new_request_id, request_id_var
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (streamed responses pass through untouched) that
+    assigns each request a trace id, echoes it in X-Request-ID and records
+    latency and DB work per route template, e.g. /api/v1/symbols/quote/{ticker}.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        request_id = new_request_id(incoming)
+        id_token = request_id_var.set(request_id)
+        if scope["type"] == "websocket":
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                request_id_var.reset(id_token)
+            return
+
+        db_token = request_db_stats.set([0, 0.0])
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            # Template da rota, não o caminho, para não explodir a cardinalidade
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
+            queries, seconds = request_db_stats.get()
+            DB_QUERIES_PER_REQUEST.labels(path).observe(queries)
+            DB_TIME_PER_REQUEST.labels(path).observe(seconds)
+            request_db_stats.reset(db_token)
+            request_id_var.reset(id_token)
@@ -1,8 +1,12 @@
 from fastapi import APIRouter
 from app.api.endpoints.symbols import router as symbols_router
 from app.api.endpoints.auth import router as auth_router
+from app.api.endpoints.simulator import router as simulator_router
+from app.api.endpoints.screening import router as screening_router
 
 api_router = APIRouter()
 
 api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
 api_router.include_router(symbols_router, prefix="/symbols", tags=["symbols"])
+api_router.include_router(simulator_router, prefix="/simulator", tags=["simulator"])
+api_router.include_router(screening_router, prefix="/screening", tags=["screening"])
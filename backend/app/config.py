@@ -5,15 +5,103 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+    POSTGRES_PORT: int = 5432
     REDIS_HOST: str
+    REDIS_PORT: int = 6379
     SECRET_KEY: str
     BRAPI_TOKEN: str = ""
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    QUOTE_DEADLINE_SECONDS: float = 8.0
+    QUOTE_BATCH_MAX_TICKERS: int = 60
+    PROVIDER_CONCURRENCY: int = 8
+    CACHE_LRU_SIZE: int = 2048
+    CACHE_PRICE_TTL_SECONDS: int = 15
+    CACHE_FUNDAMENTALS_TTL_SECONDS: int = 6 * 3600
+    CACHE_SEARCH_TTL_SECONDS: int = 3600
+    CACHE_ANALYTICS_TTL_SECONDS: int = 6 * 3600
+    # Por quanto tempo (múltiplo do TTL) uma entrada vencida ainda pode ser servida
+    CACHE_STALE_MULTIPLIER: int = 4
+    SINGLEFLIGHT_REDIS_LOCK: bool = False
+    SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS: float = 10.0
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_PER_HOST: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_HTTP2: bool = True
+    SIMULATOR_MAX_PATHS: int = 500_000
+    SIMULATOR_CHUNK_PATHS: int = 25_000
+    SIMULATOR_MAX_ASSETS: int = 50
+    SENSITIVITY_MAX_AXIS_POINTS: int = 200
+    SENSITIVITY_MAX_CELLS: int = 100_000
+    INGESTION_BATCH_SIZE: int = 50
+    # 0 desativa a ingestão agendada dentro da API
+    INGESTION_INTERVAL_HOURS: float = 0
+    # Diretório dos arquivos .npy compartilhados via mmap (vazio = só memória)
+    PRICE_STORE_DIR: str = ""
+    # Linhas lidas do banco por consulta nas exportações em streaming
+    EXPORT_BATCH_SIZE: int = 1000
+    PRICE_FEED_INTERVAL_SECONDS: float = 15.0
+    PRICE_FEED_QUEUE_SIZE: int = 100
+    # Distribui o feed entre workers via Redis pub/sub
+    PRICE_FEED_REDIS: bool = False
+    # Requisições por segundo a cada provedor (0 = sem limite)
+    RATE_LIMIT_YAHOO_PER_SECOND: float = 2.0
+    RATE_LIMIT_INVESTIDOR10_PER_SECOND: float = 1.0
+    RATE_LIMIT_STATUS_INVEST_PER_SECOND: float = 1.0
+    RATE_LIMIT_BURST: float = 5.0
+    # Aquecimento em segundo plano dos tickers mais consultados
+    SCHEDULER_ENABLED: bool = False
+    SCHEDULER_HOT_SET_SIZE: int = 50
+    SCHEDULER_HALF_LIFE_SECONDS: float = 3600.0
+    SCHEDULER_INTERVAL_SECONDS: float = 15.0
+    SCHEDULER_OFF_HOURS_INTERVAL_SECONDS: float = 1800.0
+    SCHEDULER_MAX_RETRIES: int = 3
+    SCHEDULER_BACKOFF_SECONDS: float = 1.0
+    # Índice local de busca é recarregado da tabela symbols após este tempo
+    SEARCH_INDEX_RELOAD_SECONDS: float = 3600.0
+    # Circuit breakers por provedor
+    BREAKER_WINDOW: int = 20
+    BREAKER_MIN_CALLS: int = 5
+    BREAKER_FAILURE_RATIO: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 5.0
+    BREAKER_SLOW_CALL_RATIO: float = 0.8
+    BREAKER_OPEN_SECONDS: float = 30.0
+    BREAKER_LATENCY_SAMPLES: int = 200
+    # Timeout adaptativo = p99 observado x multiplicador (limitado a HTTP_TIMEOUT_SECONDS)
+    ADAPTIVE_TIMEOUT_MULTIPLIER: float = 2.0
+    ADAPTIVE_TIMEOUT_MIN_SECONDS: float = 1.0
+    # Threads dedicadas às chamadas bloqueantes do yfinance
+    YAHOO_THREAD_WORKERS: int = 4
+    # Hash de senhas: custo do bcrypt e pool de processos dedicado
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    # Hashes em andamento + na fila; acima disso register/token respondem 429
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Cache do usuário autenticado (LRU local curto + Redis)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_LOCAL_TTL_SECONDS: int = 30
+    PRINCIPAL_REDIS_TTL_SECONDS: int = 600
+    # Pool de conexões do Postgres (por engine: síncrona e asyncpg)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Observabilidade
+    SQL_ECHO: bool = False
+    LOG_LEVEL: str = "INFO"
+    # Hosts internos (host[:porta], separados por vírgula) que recebem o X-Request-ID
+    TRACE_PROPAGATION_HOSTS: str = ""
 
     @property
     def DATABASE_URL(self) -> str:
-        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
     class Config:
         env_file = ".env"
@@ -1,15 +1,89 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from app.api.middleware import MetricsMiddleware
 from app.api.router import api_router
+from app.config import settings
+from app.models.database import async_engine, engine
+from app.services.cache import quote_cache
+from app.services.circuit_breaker import breakers
+from app.services.http_client import http_pool
+from app.services.metrics import CacheCollector, PoolCollector
+from app.services.password_hasher import password_hasher
+from app.services.price_feed import price_feed
+from app.services.price_ingestion import run_ingestion_job
+from app.services.principal_cache import principal_cache
+from app.services.ranking import ranking_service
+from app.services.rate_limit import provider_limits
+from app.services.redis_client import close_redis
+from app.services.scheduler import refresh_scheduler
+from app.services.singleflight import singleflight
+from app.services.yahoo_service import yahoo_executor
+from app.utils.tracing import RequestIdFilter
 
-app = FastAPI(title="Investment Analyzer")
+logger = logging.getLogger(__name__)
+
+REGISTRY.register(CacheCollector(quote_cache, singleflight))
+REGISTRY.register(PoolCollector({"sync": engine, "async": async_engine.sync_engine}))
+
+
+def configure_logging() -> None:
+    # No startup, e não no import: importar o app não reconfigura o root logger
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
+    )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(RequestIdFilter())
+
+
+async def ingestion_loop(interval_hours: float):
+    while True:
+        try:
+            await asyncio.to_thread(run_ingestion_job)
+        except Exception as exc:
+            logger.warning("Falha na ingestão agendada de preços: %s", exc)
+        await asyncio.sleep(interval_hours * 3600)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    ingestion = None
+    if settings.INGESTION_INTERVAL_HOURS > 0:
+        ingestion = asyncio.create_task(ingestion_loop(settings.INGESTION_INTERVAL_HOURS))
+    # Ranking calculado uma vez; depois só os tickers atualizados mudam
+    await asyncio.to_thread(ranking_service.build)
+    await password_hasher.start()
+    price_feed.start()
+    if settings.SCHEDULER_ENABLED:
+        refresh_scheduler.start()
+    yield
+    await refresh_scheduler.stop()
+    await price_feed.stop()
+    if ingestion is not None:
+        ingestion.cancel()
+    # Fecha as conexões keep-alive com os provedores, o Redis e o Postgres
+    await http_pool.aclose()
+    await close_redis()
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    yahoo_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Investment Analyzer", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router, prefix="/api/v1")
 
@@ -19,4 +93,17 @@ def read_root():
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "cache": quote_cache.stats.as_dict(),
+        "singleflight": singleflight.stats.as_dict(),
+        "principal_cache": principal_cache.stats.as_dict(),
+        "password_hasher": password_hasher.as_dict(),
+        "rate_limits": provider_limits.as_dict(),
+        "circuit_breakers": breakers.as_dict(),
+        "scheduler": refresh_scheduler.as_dict(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
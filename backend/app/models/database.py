@@ -1,10 +1,29 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.services.metrics import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    # Descarta conexões derrubadas pelo Postgres/PgBouncer antes de usá-las
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+}
+
+# SQL_ECHO só para depuração: logar cada consulta pesa no caminho quente
+engine = create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO, **POOL_OPTIONS)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrona (asyncpg) para os endpoints: a concorrência passa a ser
+# limitada pelo pool de conexões, não pelas threads do AnyIO
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, echo=settings.SQL_ECHO, **POOL_OPTIONS)
+instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,3 +32,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, func
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 
@@ -17,6 +17,8 @@ class User(Base):
     objective = Column(String(20))
     is_active = Column(Boolean, default=True)
     subscription_plan = Column(String(20), default="free")
+    # Incrementar revoga os tokens emitidos antes (claim "ver")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 class Symbol(Base):
     __tablename__ = "symbols"
@@ -25,14 +27,41 @@ class Symbol(Base):
     ticker = Column(String(20), unique=True, index=True)
     name = Column(String(255))
     asset_type = Column(String(50))
+    # Última barra ingerida; a ingestão incremental continua a partir daqui
+    last_price_date = Column(DateTime)
     prices = relationship("Price", back_populates="symbol")
 
 class Price(Base):
     __tablename__ = "prices"
+    __table_args__ = (
+        # Leituras por intervalo (gráficos, calibração) ficam index-only graças ao INCLUDE
+        Index(
+            "ix_prices_symbol_id_date", "symbol_id", "date",
+            unique=True, postgresql_include=["close", "volume"],
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol_id = Column(Integer, ForeignKey("symbols.id"))
     date = Column(DateTime, default=datetime.utcnow)
     close = Column(Float)
-    volume = Column(Integer)
+    volume = Column(BigInteger)
     symbol = relationship("Symbol", back_populates="prices")
+
+class Calibration(Base):
+    __tablename__ = "calibrations"
+
+    symbol_id = Column(Integer, ForeignKey("symbols.id"), primary_key=True)
+    # Estado incremental: somas dos log-retornos até a última barra processada
+    last_price_date = Column(DateTime)
+    last_close = Column(Float)
+    n_returns = Column(Integer, default=0)
+    sum_log_return = Column(Float, default=0.0)
+    sum_sq_log_return = Column(Float, default=0.0)
+    periods_per_year = Column(Integer, default=252)
+    # Parâmetros anualizados usados pelo simulador
+    log_drift = Column(Float)
+    mu = Column(Float)
+    sigma = Column(Float)
+    dividend_yield = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
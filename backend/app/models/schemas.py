@@ -1,6 +1,6 @@
-from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserBase(BaseModel):
@@ -48,12 +48,24 @@ class SymbolRead(SymbolBase):
         from_attributes = True
 
 
+class QuoteBatchRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1)
+
+
 class SimulatorInput(BaseModel):
     ticker: str
-    initial_investment: float
-    profit_target: float
+    initial_investment: float = Field(..., gt=0)
+    profit_target: float = Field(..., gt=0)
     method: str = "montecarlo"
     reinvest_dividends: bool = True
+    # Parâmetros anuais em decimal (0.12 = 12% a.a.)
+    mu: Optional[float] = None
+    sigma: Optional[float] = Field(None, ge=0)
+    dividend_yield: Optional[float] = Field(None, ge=0)
+    horizon_years: int = Field(10, ge=1, le=50)
+    n_paths: int = Field(10_000, ge=100)
+    seed: Optional[int] = None
+    antithetic: bool = True
 
 
 class SimulatorResult(BaseModel):
@@ -69,3 +81,46 @@ class SimulatorResult(BaseModel):
     assumptions: dict
     error: Optional[str] = None
     warning: Optional[str] = None
+
+
+class PortfolioPosition(BaseModel):
+    ticker: str
+    amount: float = Field(..., gt=0)
+
+
+class PortfolioSimulatorInput(BaseModel):
+    positions: List[PortfolioPosition] = Field(..., min_length=1)
+    profit_target: float = Field(..., gt=0)
+    reinvest_dividends: bool = True
+    # Janela do histórico usada para estimar retornos e covariância
+    lookback_years: int = Field(3, ge=1, le=20)
+    horizon_years: int = Field(10, ge=1, le=50)
+    n_paths: int = Field(10_000, ge=100)
+    seed: Optional[int] = None
+    antithetic: bool = True
+
+
+class PortfolioSimulatorResult(BaseModel):
+    tickers: List[str]
+    initial_investment: float
+    profit_target: float
+    method: str = "montecarlo"
+    reinvest_dividends: bool
+    p10_months: Optional[float] = None
+    p50_months: Optional[float] = None
+    p90_months: Optional[float] = None
+    prob_not_hit_in_5y: Optional[float] = None
+    assumptions: dict
+    error: Optional[str] = None
+    warning: Optional[str] = None
+
+class BacktestInput(BaseModel):
+    profile: Optional[str] = None
+    # Substituem pesos do perfil (mesmos nomes de ScoreWeights: pl, roe, dy...)
+    weights: Optional[Dict[str, float]] = None
+    top_n: int = Field(10, ge=1, le=100)
+    rebalance: str = "monthly"
+    start: Optional[date] = None
+    end: Optional[date] = None
+    cost_bps: float = Field(0.0, ge=0, le=500)
+    tipo: Optional[str] = None
@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import Price, Symbol
+
+
+class PriceRepository:
+    @staticmethod
+    def get_window(
+        db: Session,
+        tickers: Iterable[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Dict[str, list]]:
+        """
+        Close/volume series for many symbols over [start, end) in one query.
+        Only columns covered by ix_prices_symbol_id_date are selected, so
+        Postgres can answer with an index-only range scan per symbol.
+        Returns {ticker: {"dates": [...], "close": [...], "volume": [...]}}.
+        """
+        tickers = [t.strip().upper().replace(".SA", "") for t in tickers]
+        ids = dict(db.execute(select(Symbol.id, Symbol.ticker).where(Symbol.ticker.in_(tickers))).all())
+        if not ids:
+            return {}
+
+        query = select(Price.symbol_id, Price.date, Price.close, Price.volume).where(
+            Price.symbol_id.in_(ids)
+        )
+        if start is not None:
+            query = query.where(Price.date >= start)
+        if end is not None:
+            query = query.where(Price.date < end)
+        query = query.order_by(Price.symbol_id, Price.date)
+
+        series: Dict[str, Dict[str, list]] = {}
+        for symbol_id, date, close, volume in db.execute(query):
+            data = series.get(ids[symbol_id])
+            if data is None:
+                data = series[ids[symbol_id]] = {"dates": [], "close": [], "volume": []}
+            data["dates"].append(date)
+            data["close"].append(close)
+            data["volume"].append(volume)
+        return series
+
+    @staticmethod
+    def last_ingested(db: Session) -> Optional[datetime]:
+        """
+        Latest bar date over all symbols: changes whenever ingestion adds
+        prices, so it versions anything derived from them.
+        """
+        return db.execute(select(func.max(Symbol.last_price_date))).scalar()
+
+    @staticmethod
+    def symbol_id_query(ticker: str) -> Select:
+        ticker = ticker.strip().upper().replace(".SA", "")
+        return select(Symbol.id).where(Symbol.ticker == ticker)
+
+    @staticmethod
+    def symbol_id(db: Session, ticker: str) -> Optional[int]:
+        return db.execute(PriceRepository.symbol_id_query(ticker)).scalar()
+
+    @staticmethod
+    async def symbol_id_async(db: AsyncSession, ticker: str) -> Optional[int]:
+        return (await db.execute(PriceRepository.symbol_id_query(ticker))).scalar()
+
+    @staticmethod
+    def page_query(
+        symbol_id: int,
+        after: Optional[datetime] = None,
+        limit: int = 1000,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Select:
+        """
+        Keyset page of one symbol's bars ordered by date, strictly after
+        `after`. Each page is a range scan on ix_prices_symbol_id_date, so
+        late pages cost the same as the first (no OFFSET).
+        """
+        query = select(Price.date, Price.close, Price.volume).where(Price.symbol_id == symbol_id)
+        if after is not None:
+            query = query.where(Price.date > after)
+        if start is not None:
+            query = query.where(Price.date >= start)
+        if end is not None:
+            query = query.where(Price.date < end)
+        return query.order_by(Price.date).limit(limit)
+
+    @staticmethod
+    def page(
+        db: Session,
+        symbol_id: int,
+        after: Optional[datetime] = None,
+        limit: int = 1000,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict]:
+        query = PriceRepository.page_query(symbol_id, after, limit, start, end)
+        return [{"date": date, "close": close, "volume": volume} for date, close, volume in db.execute(query)]
+
+    @staticmethod
+    async def page_async(
+        db: AsyncSession,
+        symbol_id: int,
+        after: Optional[datetime] = None,
+        limit: int = 1000,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict]:
+        result = await db.execute(PriceRepository.page_query(symbol_id, after, limit, start, end))
+        return [{"date": date, "close": close, "volume": volume} for date, close, volume in result]
+
+    @staticmethod
+    def iter_prices(
+        db: Session,
+        symbol_id: int,
+        batch_size: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[Dict]:
+        after = None
+        while True:
+            rows = PriceRepository.page(db, symbol_id, after, batch_size, start, end)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["date"]
+
+    @staticmethod
+    async def iter_prices_async(
+        db: AsyncSession,
+        symbol_id: int,
+        batch_size: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> AsyncIterator[Dict]:
+        after = None
+        while True:
+            rows = await PriceRepository.page_async(db, symbol_id, after, batch_size, start, end)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["date"]
+
+    @staticmethod
+    def last_dates(db: Session) -> Dict[str, Optional[datetime]]:
+        return dict(db.execute(select(Symbol.ticker, Symbol.last_price_date)).all())
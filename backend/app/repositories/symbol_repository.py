@@ -0,0 +1,71 @@
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import Symbol
+
+
+def symbol_row(row) -> Dict:
+    return {
+        "ticker": row.ticker,
+        "name": row.name,
+        "asset_type": row.asset_type,
+        "last_price_date": row.last_price_date,
+    }
+
+
+class SymbolRepository:
+    @staticmethod
+    def page_query(after: Optional[str] = None, limit: int = 100, asset_type: Optional[str] = None) -> Select:
+        """
+        Keyset page ordered by ticker: rows strictly after `after`, so every
+        page is an index range scan on the unique ticker index.
+        """
+        query = select(Symbol.ticker, Symbol.name, Symbol.asset_type, Symbol.last_price_date)
+        if after is not None:
+            query = query.where(Symbol.ticker > after)
+        if asset_type is not None:
+            query = query.where(Symbol.asset_type == asset_type)
+        return query.order_by(Symbol.ticker).limit(limit)
+
+    @staticmethod
+    def page(
+        db: Session,
+        after: Optional[str] = None,
+        limit: int = 100,
+        asset_type: Optional[str] = None,
+    ) -> List[Dict]:
+        return [symbol_row(row) for row in db.execute(SymbolRepository.page_query(after, limit, asset_type))]
+
+    @staticmethod
+    async def page_async(
+        db: AsyncSession,
+        after: Optional[str] = None,
+        limit: int = 100,
+        asset_type: Optional[str] = None,
+    ) -> List[Dict]:
+        result = await db.execute(SymbolRepository.page_query(after, limit, asset_type))
+        return [symbol_row(row) for row in result]
+
+    @staticmethod
+    def iter_all(db: Session, batch_size: int, asset_type: Optional[str] = None) -> Iterator[Dict]:
+        after = None
+        while True:
+            rows = SymbolRepository.page(db, after, batch_size, asset_type)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["ticker"]
+
+    @staticmethod
+    async def iter_all_async(
+        db: AsyncSession, batch_size: int, asset_type: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        after = None
+        while True:
+            rows = await SymbolRepository.page_async(db, after, batch_size, asset_type)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["ticker"]
@@ -0,0 +1,199 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.services.price_store import bars_per_year, price_store
+from app.services.screening import FundamentalsUniverse, ScoreWeights, ScreenFilters, get_universe
+
+# Meses por período de rebalanceamento
+REBALANCE_MONTHS = {"monthly": 1, "quarterly": 3, "semiannual": 6, "yearly": 12}
+
+
+@dataclass(frozen=True)
+class BacktestSpec:
+    weights: ScoreWeights
+    top_n: int = 10
+    rebalance: str = "monthly"
+    start: Optional[date] = None
+    end: Optional[date] = None
+    cost_bps: float = 0.0
+    tipo: Optional[str] = None
+    # Última barra ingerida: novos preços mudam a chave do cache
+    data_as_of: Optional[str] = None
+
+    def digest(self) -> str:
+        """
+        Hash of the strategy, window and price data version: profiles with
+        the same weights share their cached results.
+        """
+        raw = json.dumps(
+            {
+                "weights": self.weights.as_dict(),
+                "top_n": self.top_n,
+                "rebalance": self.rebalance,
+                "start": self.start,
+                "end": self.end,
+                "cost_bps": self.cost_bps,
+                "tipo": self.tipo,
+                "data_as_of": self.data_as_of,
+            },
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def rebalance_rows(dates: np.ndarray, months: int) -> np.ndarray:
+    """
+    Index of the first date of every period (month, quarter, ...).
+    """
+    period = dates.astype("datetime64[M]").astype(np.int64) // months
+    return np.flatnonzero(np.diff(period, prepend=period[0] - 1))
+
+
+def trailing_volatility(close: np.ndarray, rows: np.ndarray, lookback: int, periods_per_year: float) -> np.ndarray:
+    """
+    Annualized volatility of log returns over the `lookback` bars up to each
+    of `rows`, for every asset at once (R, N), from cumulative sums of the
+    returns and their squares. NaN with fewer than two returns.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(close), axis=0)
+    valid = np.isfinite(returns)
+    returns = np.where(valid, returns, 0.0)
+    zeros = np.zeros((1, close.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(returns, axis=0)])
+    squares = np.concatenate([zeros, np.cumsum(returns * returns, axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    # Retornos até a barra t ocupam as posições [0, t) das somas acumuladas
+    hi = rows
+    lo = np.maximum(rows - lookback, 0)
+    n = counts[hi] - counts[lo]
+    total = sums[hi] - sums[lo]
+    total_sq = squares[hi] - squares[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (total_sq - total * total / n) / (n - 1)
+    return np.where(n >= 2, np.sqrt(np.maximum(variance, 0.0) * periods_per_year), np.nan)
+
+
+def top_n_weights(scores: np.ndarray, eligible: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Equal weights over the `top_n` best eligible scores of every row (R, N).
+    Ties keep universe order, as in FundamentalsUniverse.top_k.
+    """
+    ranked = np.argsort(np.where(eligible, -scores, np.inf), axis=1, kind="stable")[:, :top_n]
+    chosen = np.take_along_axis(eligible, ranked, axis=1)
+    weights = np.zeros(scores.shape)
+    np.put_along_axis(weights, ranked, chosen.astype(np.float64), axis=1)
+    held = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, held, out=np.zeros_like(weights), where=held > 0)
+
+
+def replay(close: np.ndarray, rows: np.ndarray, weights: np.ndarray, cost: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Buy-and-hold between rebalances of the (R, N) target weights. Returns the
+    equity curve over every bar from the first rebalance (T,) and the one-way
+    turnover of each rebalance (R,), all as array operations over R and T.
+    Periods without holdings stay in cash.
+    """
+    period = np.searchsorted(rows, np.arange(len(close)), side="right") - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.nan_to_num(close / close[rows][period])
+    invested = weights.sum(axis=1) > 0
+    value = np.where(invested[period], (weights[period] * growth).sum(axis=1), 1.0)
+
+    # Valor de cada período no rebalanceamento seguinte, antes dos custos
+    ends = np.append(rows[1:], len(close) - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        end_growth = np.nan_to_num(close[ends] / close[rows])
+    gross = np.where(invested, (weights * end_growth).sum(axis=1), 1.0)
+
+    drifted = np.zeros_like(weights)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drifted[1:] = np.nan_to_num(weights[:-1] * end_growth[:-1] / gross[:-1, None])
+    traded = np.abs(weights - drifted).sum(axis=1)
+    after_costs = 1.0 - cost * traded
+
+    # Patrimônio no início de cada período, já descontados os custos da troca
+    level = np.cumprod(np.concatenate([[1.0], gross[:-1]])) * np.cumprod(after_costs)
+    return level[period] * value, traded / 2
+
+
+def summarize(dates: np.ndarray, equity: np.ndarray) -> Dict[str, Optional[float]]:
+    years = (dates[-1] - dates[0]).astype(np.int64) / 365.25
+    returns = np.diff(equity) / equity[:-1]
+    periods_per_year = len(returns) / years if years > 0 else None
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    volatility = float(returns.std(ddof=1) * np.sqrt(periods_per_year)) if len(returns) > 1 and periods_per_year else None
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "cagr": float(equity[-1] ** (1 / years) - 1.0) if years > 0 and equity[-1] > 0 else None,
+        "volatility": volatility,
+        "sharpe": float(returns.mean() * periods_per_year / volatility) if volatility else None,
+        "max_drawdown": float(drawdown.min()),
+    }
+
+
+def run_backtest(spec: BacktestSpec, db: Optional[Session] = None,
+                 universe: Optional[FundamentalsUniverse] = None) -> Dict:
+    """
+    Replays the ranking strategy: on the first bar of every rebalance period
+    the `top_n` best scores among assets with a price that day are bought in
+    equal weights and held until the next rebalance.
+
+    There is no point-in-time store of fundamentals, so P/L, ROE, DY and
+    P/VPA come from the current snapshot (look-ahead for those terms);
+    volatility is measured from prices up to each rebalance date. All
+    rebalance dates are scored, selected and replayed as (dates x assets)
+    arrays; there is no per-day Python loop.
+    """
+    universe = universe or get_universe()
+    dates, tickers, close = price_store.matrix(universe.tickers, spec.start, spec.end, db=db)
+    if len(dates) < 2:
+        return {"error": "Histórico de preços insuficiente para o período."}
+
+    columns = np.array([universe.index[t] for t in tickers])
+    rows = rebalance_rows(dates, REBALANCE_MONTHS[spec.rebalance])
+    close, dates, rows = close[rows[0]:], dates[rows[0]:], rows - rows[0]
+    periods_per_year = bars_per_year(dates)
+    lookback = max(int(round(periods_per_year)), 2)
+
+    volatility = trailing_volatility(close, rows, lookback, periods_per_year)
+    scores = universe.score(spec.weights, rows=columns, volatility=volatility)
+    listed = universe.mask(ScreenFilters(tipo=spec.tipo))[columns]
+    eligible = np.isfinite(close[rows]) & listed
+
+    cost = spec.cost_bps / 10_000
+    weights = top_n_weights(scores, eligible, spec.top_n)
+    equity, turnover = replay(close, rows, weights, cost)
+    benchmark = eligible / np.maximum(eligible.sum(axis=1, keepdims=True), 1)
+    benchmark_equity, _ = replay(close, rows, benchmark, cost)
+
+    names = np.array(tickers, dtype=object)
+    rebalances: List[Dict] = [
+        {
+            "date": str(dates[row]),
+            "holdings": names[weights[i] > 0][np.argsort(-scores[i][weights[i] > 0], kind="stable")].tolist(),
+            "turnover": round(float(turnover[i]), 4),
+        }
+        for i, row in enumerate(rows)
+    ]
+    return {
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "assets": len(tickers),
+        "metrics": {
+            **summarize(dates, equity),
+            "avg_turnover": float(turnover[1:].mean()) if len(turnover) > 1 else 0.0,
+        },
+        "benchmark": summarize(dates, benchmark_equity),
+        "equity": {
+            "dates": np.datetime_as_string(dates, unit="D").tolist(),
+            "strategy": np.round(equity, 6).tolist(),
+            "benchmark": np.round(benchmark_equity, 6).tolist(),
+        },
+        "rebalances": rebalances,
+    }
@@ -0,0 +1,353 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from app.config import settings
+from app.services.rate_limit import provider_limits
+from app.services.redis_client import get_redis
+from app.services.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+PRICE = "price"
+FUNDAMENTALS = "fundamentals"
+SEARCH = "search"
+# Resultados calculados (backtests, grades do simulador), não dados de provedores
+ANALYTICS = "analytics"
+
+# Campos que mudam a cada negócio; os demais são tratados como fundamentos
+FIELD_TIERS = {
+    "price": PRICE,
+    "change_percent": PRICE,
+    "previous_close": PRICE,
+    "market_cap": PRICE,
+}
+
+# Tempo que o Redis fica indisponível antes de tentarmos de novo
+REDIS_RETRY_SECONDS = 30
+# Fração do TTL a partir da qual o aquecimento recarrega a entrada
+REFRESH_AHEAD = 0.8
+
+
+def tier_ttl(tier: str) -> int:
+    return {
+        PRICE: settings.CACHE_PRICE_TTL_SECONDS,
+        FUNDAMENTALS: settings.CACHE_FUNDAMENTALS_TTL_SECONDS,
+        SEARCH: settings.CACHE_SEARCH_TTL_SECONDS,
+        ANALYTICS: settings.CACHE_ANALYTICS_TTL_SECONDS,
+    }[tier]
+
+
+def tier_max_age(tier: str) -> int:
+    return tier_ttl(tier) * (1 + settings.CACHE_STALE_MULTIPLIER)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    tier: str
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+    def dumps(self) -> str:
+        return json.dumps({"v": self.value, "t": self.fetched_at, "tier": self.tier})
+
+    @staticmethod
+    def loads(raw: str) -> "CacheEntry":
+        data = json.loads(raw)
+        return CacheEntry(value=data["v"], fetched_at=data["t"], tier=data["tier"])
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    redis_hits: int = 0
+    redis_errors: int = 0
+    refreshes: int = 0
+
+    def as_dict(self) -> Dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+            "refreshes": self.refreshes,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+        }
+
+
+def annotate_stale_fields(entry: CacheEntry, now: float) -> Any:
+    """
+    Fields with a shorter TTL than their entry (e.g. a scraper's price inside
+    a fundamentals payload) are listed under `stale_fields` once expired, so
+    consumers can prefer a fresher source for them. This is an annotation,
+    not per-field expiry: an entry is stored and reloaded whole at its own
+    tier, so e.g. the market cap and DY in a Yahoo quote share its PRICE TTL.
+    """
+    value = entry.value
+    if not isinstance(value, dict):
+        return value
+    age = entry.age(now)
+    stale = [
+        name for name, tier in FIELD_TIERS.items()
+        if value.get(name) is not None and tier != entry.tier and age > tier_ttl(tier)
+    ]
+    if not stale:
+        return value
+    return {**value, "stale_fields": stale}
+
+
+class TieredCache:
+    """
+    Small in-process LRU in front of Redis with stale-while-revalidate:
+    expired entries are still served while a single background task
+    reloads them.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._lru: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._redis_down_until = 0.0
+        self._listeners: Dict[str, List[Callable[[str, Any], Awaitable[None]]]] = {}
+
+    def subscribe(self, namespace: str, listener: Callable[[str, Any], Awaitable[None]]) -> None:
+        """
+        Registers an async listener called with (key, value) whenever a key of
+        `namespace` is stored, i.e. after every successful provider load.
+        """
+        self._listeners.setdefault(namespace, []).append(listener)
+
+    async def _notify(self, key: str, value: Any) -> None:
+        namespace = key.rsplit(":", 1)[0]
+        for listener in self._listeners.get(namespace, ()):
+            try:
+                await listener(key, value)
+            except Exception as exc:
+                logger.warning("Falha no listener de %s: %s", key, exc)
+
+    def _lru_get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+        return entry
+
+    def _lru_set(self, key: str, entry: CacheEntry) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, exc: Exception) -> None:
+        self.stats.redis_errors += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning("Redis indisponível, usando apenas cache local: %s", exc)
+
+    async def _redis_get(self, key: str) -> Optional[CacheEntry]:
+        if not self._redis_available():
+            return None
+        try:
+            raw = await get_redis().get(f"cache:{key}")
+        except (RedisError, OSError) as exc:
+            self._redis_failed(exc)
+            return None
+        if raw is None:
+            return None
+        self.stats.redis_hits += 1
+        return CacheEntry.loads(raw)
+
+    async def _redis_set(self, key: str, entry: CacheEntry) -> None:
+        if not self._redis_available():
+            return
+        try:
+            await get_redis().set(f"cache:{key}", entry.dumps(), ex=tier_max_age(entry.tier))
+        except (RedisError, OSError) as exc:
+            self._redis_failed(exc)
+
+    async def lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._lru_get(key)
+        if entry is None:
+            entry = await self._redis_get(key)
+            if entry is not None:
+                self._lru_set(key, entry)
+        if entry is not None and entry.age(time.time()) > tier_max_age(entry.tier):
+            return None
+        return entry
+
+    async def set(self, key: str, value: Any, tier: str) -> None:
+        entry = CacheEntry(value=value, fetched_at=time.time(), tier=tier)
+        self._lru_set(key, entry)
+        await self._redis_set(key, entry)
+        await self._notify(key, value)
+
+    async def _peek_fresh(self, key: str) -> Any:
+        entry = await self._redis_get(key)
+        if entry is None or entry.age(time.time()) > tier_ttl(entry.tier):
+            return None
+        self._lru_set(key, entry)
+        return entry.value
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], tier: str) -> Any:
+        async def fetch():
+            value = await loader()
+            # Falhas dos provedores retornam None e não são cacheadas
+            if value is not None:
+                await self.set(key, value, tier)
+            return value
+
+        # Chamadas concorrentes para a mesma chave compartilham uma única busca
+        return await singleflight.do(key, fetch, check=lambda: self._peek_fresh(key))
+
+    def schedule_refresh(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self.stats.refreshes += 1
+
+        async def run():
+            try:
+                await refresh()
+            except Exception as exc:
+                logger.warning("Falha ao atualizar %s em segundo plano: %s", key, exc)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], tier: str) -> Any:
+        entry = await self.lookup(key)
+        now = time.time()
+        if entry is not None:
+            if entry.age(now) <= tier_ttl(entry.tier):
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+                self.schedule_refresh(key, lambda: self._load(key, loader, tier))
+            return annotate_stale_fields(entry, now)
+
+        self.stats.misses += 1
+        return await self._load(key, loader, tier)
+
+    async def peek(self, key: str) -> Any:
+        """
+        Cached value (fresh or stale) without ever loading it.
+        """
+        entry = await self.lookup(key)
+        return annotate_stale_fields(entry, time.time()) if entry is not None else None
+
+    async def warm(self, key: str, loader: Callable[[], Awaitable[Any]], tier: str) -> Any:
+        """
+        Refresh-ahead used by the background scheduler: reloads the key when
+        it is missing or in the last part of its TTL, so request handlers
+        keep hitting fresh entries.
+        """
+        entry = await self.lookup(key)
+        if entry is not None and entry.age(time.time()) < tier_ttl(entry.tier) * REFRESH_AHEAD:
+            return entry.value
+        return await self._load(key, loader, tier)
+
+    async def _redis_get_many(self, keys: List[str]) -> Dict[str, CacheEntry]:
+        if not keys or not self._redis_available():
+            return {}
+        try:
+            raws = await get_redis().mget([f"cache:{key}" for key in keys])
+        except (RedisError, OSError) as exc:
+            self._redis_failed(exc)
+            return {}
+        entries = {key: CacheEntry.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self.stats.redis_hits += len(entries)
+        return entries
+
+    async def lookup_many(
+        self, keys: List[str], track: bool = True
+    ) -> Tuple[Dict[str, Any], List[str], List[str]]:
+        """
+        Splits keys into cached values, keys that are stale (served but due a
+        refresh) and keys that are missing altogether. Keys not in the local
+        LRU are read from Redis with a single MGET. Background callers pass
+        `track=False` so they do not count as user hits and misses.
+        """
+        entries = {key: self._lru_get(key) for key in keys}
+        from_redis = await self._redis_get_many([key for key, entry in entries.items() if entry is None])
+        for key, entry in from_redis.items():
+            self._lru_set(key, entry)
+            entries[key] = entry
+
+        values, stale, missing = {}, [], []
+        now = time.time()
+        for key in keys:
+            entry = entries[key]
+            if entry is None or entry.age(now) > tier_max_age(entry.tier):
+                self.stats.misses += track
+                missing.append(key)
+                continue
+            if entry.age(now) <= tier_ttl(entry.tier):
+                self.stats.hits += track
+            else:
+                self.stats.stale_hits += track
+                stale.append(key)
+            values[key] = annotate_stale_fields(entry, now)
+        return values, stale, missing
+
+
+quote_cache = TieredCache(maxsize=settings.CACHE_LRU_SIZE)
+
+
+def cache_key(namespace: str, *args) -> str:
+    return ":".join([namespace, *(str(arg).strip().upper() for arg in args)])
+
+
+def cached(namespace: str, tier: str):
+    """
+    Caches an async provider method by its positional arguments. Upstream
+    loads go through the provider's rate limit (the namespace prefix);
+    loads triggered by `.warm` yield to user requests.
+    The undecorated coroutine stays reachable as `.uncached`,
+    `.warm(*args)` refreshes the entry ahead of expiry and `.peek(*args)`
+    reads it without loading.
+    """
+    provider = namespace.split(":", 1)[0]
+
+    def decorator(fn):
+        async def load(*args, background: bool = False):
+            await provider_limits.acquire(provider, background=background)
+            return await fn(*args)
+
+        @functools.wraps(fn)
+        async def wrapper(*args):
+            return await quote_cache.get_or_load(cache_key(namespace, *args), lambda: load(*args), tier)
+
+        async def warm(*args):
+            # Aquecimento cede a vez às requisições dos usuários no rate limit
+            return await quote_cache.warm(
+                cache_key(namespace, *args), lambda: load(*args, background=True), tier
+            )
+
+        async def peek(*args):
+            return await quote_cache.peek(cache_key(namespace, *args))
+
+        wrapper.uncached = fn
+        wrapper.warm = warm
+        wrapper.peek = peek
+        wrapper.provider = provider
+        return wrapper
+
+    return decorator
@@ -0,0 +1,206 @@
+import math
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import Calibration, Price, Symbol
+from app.services.local_data import get_local_asset
+from app.services.price_store import bars_per_year, price_store
+from app.services.yahoo_service import YahooService
+
+# Barras diárias da tabela prices; o histórico do data.json é mensal
+DAILY_PERIODS = 252
+MONTHLY_PERIODS = 12
+
+
+def annualize(n: int, total: float, total_sq: float, periods_per_year: int) -> Optional[Dict]:
+    """
+    Annualized log drift, volatility and GBM drift (mu = drift + sigma^2/2)
+    from running sums of log returns.
+    """
+    if n < 2:
+        return None
+    mean = total / n
+    variance = max((total_sq - n * mean * mean) / (n - 1), 0.0)
+    log_drift = mean * periods_per_year
+    sigma = math.sqrt(variance * periods_per_year)
+    return {"log_drift": log_drift, "sigma": sigma, "mu": log_drift + 0.5 * sigma * sigma}
+
+
+def as_parameters(calibration: Calibration, source: str) -> Dict:
+    return {
+        "mu": calibration.mu,
+        "sigma": calibration.sigma,
+        "dividend_yield": calibration.dividend_yield,
+        "log_drift": calibration.log_drift,
+        "n_returns": calibration.n_returns,
+        "as_of": calibration.last_price_date.isoformat() if calibration.last_price_date else None,
+        "source": source,
+    }
+
+
+class CalibrationService:
+    @staticmethod
+    def refresh(db: Session, symbol: Symbol) -> Optional[Calibration]:
+        """
+        Folds bars newer than the last calibrated date into the stored sums.
+        Only the new closes are read, so refreshing is O(new bars); a reset
+        calibration (no last date) is rebuilt from the whole history.
+        """
+        calibration = db.get(Calibration, symbol.id)
+        if calibration is None:
+            calibration = Calibration(
+                symbol_id=symbol.id, n_returns=0, sum_log_return=0.0,
+                sum_sq_log_return=0.0, periods_per_year=DAILY_PERIODS,
+            )
+
+        query = db.query(Price.date, Price.close).filter(
+            Price.symbol_id == symbol.id, Price.close > 0
+        )
+        if calibration.last_price_date is not None:
+            query = query.filter(Price.date > calibration.last_price_date)
+        rows = query.order_by(Price.date).all()
+        if not rows:
+            return calibration if calibration.mu is not None else None
+
+        if calibration.last_price_date is None:
+            db.add(calibration)
+
+        closes = np.fromiter((row.close for row in rows), dtype=np.float64, count=len(rows))
+        if calibration.last_close:
+            closes = np.concatenate(([calibration.last_close], closes))
+        log_returns = np.diff(np.log(closes))
+
+        calibration.n_returns += int(log_returns.size)
+        calibration.sum_log_return += float(log_returns.sum())
+        calibration.sum_sq_log_return += float(np.square(log_returns).sum())
+        calibration.last_close = float(closes[-1])
+        calibration.last_price_date = rows[-1].date
+
+        stats = annualize(
+            calibration.n_returns, calibration.sum_log_return,
+            calibration.sum_sq_log_return, calibration.periods_per_year,
+        )
+        if stats:
+            calibration.log_drift = stats["log_drift"]
+            calibration.sigma = stats["sigma"]
+            calibration.mu = stats["mu"]
+
+        dividends = YahooService.get_trailing_dividends(symbol.ticker)
+        if dividends is not None and calibration.last_close:
+            calibration.dividend_yield = dividends / calibration.last_close
+
+        db.commit()
+        return calibration if calibration.mu is not None else None
+
+    @staticmethod
+    def refresh_all(db: Session) -> int:
+        """
+        Recalibrates only the symbols that received bars after their last
+        calibration. Meant to run right after price ingestion.
+        """
+        latest = (
+            db.query(Price.symbol_id, func.max(Price.date).label("last_date"))
+            .group_by(Price.symbol_id)
+            .subquery()
+        )
+        symbols = (
+            db.query(Symbol)
+            .join(latest, latest.c.symbol_id == Symbol.id)
+            .outerjoin(Calibration, Calibration.symbol_id == Symbol.id)
+            .filter(
+                (Calibration.last_price_date.is_(None))
+                | (latest.c.last_date > Calibration.last_price_date)
+            )
+            .all()
+        )
+        for symbol in symbols:
+            CalibrationService.refresh(db, symbol)
+        return len(symbols)
+
+    @staticmethod
+    def from_local_history(ticker: str) -> Optional[Dict]:
+        asset = get_local_asset(ticker)
+        if not asset or len(asset.get("history") or []) < 3:
+            return None
+        log_returns = np.diff(np.log(np.asarray(asset["history"], dtype=np.float64)))
+        stats = annualize(
+            log_returns.size, float(log_returns.sum()),
+            float(np.square(log_returns).sum()), MONTHLY_PERIODS,
+        )
+        return {
+            **stats,
+            "dividend_yield": asset.get("dy"),
+            "n_returns": int(log_returns.size),
+            "as_of": None,
+            "source": "data.json",
+        }
+
+    @staticmethod
+    def get_parameters(db: Session, ticker: str) -> Optional[Dict]:
+        """
+        Precomputed μ, σ and dividend yield for a ticker: a plain lookup of
+        the stored calibration. Symbols not calibrated yet fall back to the
+        data.json history; calibrating them is left to ingestion, which
+        runs refresh_all.
+        """
+        ticker = ticker.upper().replace(".SA", "")
+        calibration = (
+            db.query(Calibration)
+            .join(Symbol, Symbol.id == Calibration.symbol_id)
+            .filter(Symbol.ticker == ticker, Calibration.mu.isnot(None))
+            .first()
+        )
+        if calibration is not None:
+            return as_parameters(calibration, "prices")
+        return CalibrationService.from_local_history(ticker)
+
+    @staticmethod
+    def dividend_yields(db: Optional[Session], tickers: List[str]) -> Dict[str, float]:
+        """
+        Stored dividend yields for many tickers in one query, data.json
+        values for the rest (0 when unknown).
+        """
+        stored = {}
+        if db is not None:
+            stored = dict(
+                db.query(Symbol.ticker, Calibration.dividend_yield)
+                .join(Calibration, Calibration.symbol_id == Symbol.id)
+                .filter(Symbol.ticker.in_(tickers), Calibration.dividend_yield.isnot(None))
+                .all()
+            )
+        return {
+            ticker: stored[ticker] if ticker in stored else ((get_local_asset(ticker) or {}).get("dy") or 0.0)
+            for ticker in tickers
+        }
+
+    @staticmethod
+    def portfolio_parameters(db: Optional[Session], tickers: List[str], start=None) -> Optional[Dict]:
+        """
+        Joint parameters of several assets from the price store: annualized
+        GBM drifts and the covariance of log returns over the dates on which
+        every asset has a price. None when fewer than three common returns
+        exist; `missing` lists tickers without any history.
+        """
+        dates, found, close = price_store.matrix(tickers, start=start, db=db)
+        missing = [t for t in tickers if t not in found]
+        if missing:
+            return {"missing": missing}
+        common = np.isfinite(close).all(axis=1)
+        if common.sum() < 4:
+            return None
+        dates, close = dates[common], close[common]
+        log_returns = np.diff(np.log(close), axis=0)
+        periods_per_year = bars_per_year(dates)
+        cov = np.atleast_2d(np.cov(log_returns, rowvar=False)) * periods_per_year
+        log_drift = log_returns.mean(axis=0) * periods_per_year
+        yields = CalibrationService.dividend_yields(db, found)
+        return {
+            "tickers": found,
+            "mu": log_drift + 0.5 * np.diag(cov),
+            "cov": cov,
+            "dividend_yield": np.array([yields[t] for t in found]),
+            "n_returns": int(len(log_returns)),
+            "periods_per_year": round(periods_per_year, 1),
+            "as_of": str(dates[-1]),
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+import numpy as np
+from app.config import settings
+from app.services.metrics import observe_provider_call
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker over a sliding window of recent calls. It opens
+    when the share of failed (errors, timeouts, 429 and 5xx) or slow calls crosses
+    its threshold, rejects calls while open and, after BREAKER_OPEN_SECONDS,
+    lets a single probe through (half-open) to decide whether to close.
+
+    The timeout of each call adapts to the provider's observed latency:
+    a multiple of the recent p99, clamped between the configured minimum
+    and HTTP_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes: deque = deque(maxlen=settings.BREAKER_WINDOW)
+        self._latencies: deque = deque(maxlen=settings.BREAKER_LATENCY_SAMPLES)
+        self._probing = False
+
+    def _current_state(self) -> str:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= settings.BREAKER_OPEN_SECONDS:
+            self.state = HALF_OPEN
+        return self.state
+
+    def is_open(self) -> bool:
+        """
+        True while calls would be rejected (half-open with a probe in flight
+        counts as open).
+        """
+        state = self._current_state()
+        return state == OPEN or (state == HALF_OPEN and self._probing)
+
+    def timeout(self) -> float:
+        if len(self._latencies) < settings.BREAKER_MIN_CALLS:
+            return settings.HTTP_TIMEOUT_SECONDS
+        p99 = float(np.quantile(np.fromiter(self._latencies, dtype=np.float64), 0.99))
+        return min(
+            max(p99 * settings.ADAPTIVE_TIMEOUT_MULTIPLIER, settings.ADAPTIVE_TIMEOUT_MIN_SECONDS),
+            settings.HTTP_TIMEOUT_SECONDS,
+        )
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def _record(self, ok: bool, latency: float) -> None:
+        slow = latency >= settings.BREAKER_SLOW_CALL_SECONDS
+        if ok:
+            self._latencies.append(latency)
+        if self.state == OPEN:
+            # Chamada iniciada antes de o circuito abrir
+            return
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok and not slow:
+                self.state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._trip()
+            return
+        self._outcomes.append((ok, slow))
+        if len(self._outcomes) < settings.BREAKER_MIN_CALLS:
+            return
+        failures = sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+        slow_calls = sum(1 for _, slow in self._outcomes if slow) / len(self._outcomes)
+        if failures >= settings.BREAKER_FAILURE_RATIO or slow_calls >= settings.BREAKER_SLOW_CALL_RATIO:
+            self._trip()
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        failed: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Runs `fn` under the adaptive timeout. Exceptions, timeouts and
+        results for which `failed` is true count as failures; exceptions are
+        re-raised and failed results returned as is.
+        """
+        state = self._current_state()
+        if state == OPEN or (state == HALF_OPEN and self._probing):
+            self.rejected += 1
+            observe_provider_call(self.name, "circuit_open", 0.0)
+            raise CircuitOpenError(f"{self.name}: circuito aberto")
+        if state == HALF_OPEN:
+            self._probing = True
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.timeout())
+        except asyncio.CancelledError:
+            # Cancelada pelo prazo do agregador: não é evidência sobre o provedor
+            self._probing = False
+            raise
+        except asyncio.TimeoutError:
+            self._record(False, time.monotonic() - start)
+            observe_provider_call(self.name, "timeout", time.monotonic() - start)
+            raise
+        except Exception:
+            self._record(False, time.monotonic() - start)
+            observe_provider_call(self.name, "error", time.monotonic() - start)
+            raise
+        ok = not (failed and failed(result))
+        self._record(ok, time.monotonic() - start)
+        observe_provider_call(self.name, "ok" if ok else "bad_response", time.monotonic() - start)
+        return result
+
+    def as_dict(self) -> Dict:
+        recent = len(self._outcomes)
+        return {
+            "state": self._current_state(),
+            "timeout_seconds": round(self.timeout(), 3),
+            "failure_ratio": round(sum(1 for ok, _ in self._outcomes if not ok) / recent, 3) if recent else None,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class BreakerRegistry:
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def __getitem__(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+    def is_open(self, provider: str) -> bool:
+        return self[provider].is_open()
+
+    def as_dict(self) -> Dict:
+        return {name: breaker.as_dict() for name, breaker in self._breakers.items()}
+
+
+breakers = BreakerRegistry()
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from app.config import settings
+from app.services.circuit_breaker import CircuitOpenError, breakers
+from app.utils.tracing import trace_headers
+
+logger = logging.getLogger(__name__)
+
+# Falhas esperadas de um provedor: rede, timeout, circuito aberto, JSON inválido
+PROVIDER_ERRORS = (httpx.HTTPError, asyncio.TimeoutError, CircuitOpenError, ValueError)
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def add_trace_headers(request: httpx.Request) -> None:
+    request.headers.update(trace_headers())
+
+
+def propagates_trace(host: str) -> bool:
+    # Só serviços internos recebem o X-Request-ID; sites de terceiros não
+    internal = {h.strip().lower() for h in settings.TRACE_PROPAGATION_HOSTS.split(",") if h.strip()}
+    return host.lower() in internal
+
+
+def provider_failed(response: httpx.Response) -> bool:
+    # 429 e 5xx são falhas do provedor; os demais 4xx são respostas válidas
+    return response.status_code == 429 or response.status_code >= 500
+
+
+class HttpClientPool:
+    """
+    Long-lived httpx clients shared by the provider services, one per
+    upstream host so each host gets its own keep-alive connection pool.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _build(self, host: str) -> httpx.AsyncClient:
+        http2 = settings.HTTP_HTTP2 and http2_available()
+        if settings.HTTP_HTTP2 and not http2:
+            logger.info("Pacote h2 não instalado; usando HTTP/1.1 com keep-alive")
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(
+                settings.HTTP_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_PER_HOST,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Accept': 'application/json',
+            },
+            event_hooks={"request": [add_trace_headers] if propagates_trace(host) else []},
+        )
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        host = urlsplit(url).netloc
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = self._clients[host] = self._build(host)
+        return client
+
+    async def get(self, url: str, params: Optional[Dict] = None, provider: Optional[str] = None) -> httpx.Response:
+        """
+        GET through the host's pooled client. With `provider`, the call goes
+        through that provider's circuit breaker and adaptive timeout.
+        """
+        client = self.client_for(url)
+        if provider is None:
+            return await client.get(url, params=params)
+        return await breakers[provider].call(
+            lambda: client.get(url, params=params),
+            failed=provider_failed,
+        )
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_pool = HttpClientPool()
@@ -1,30 +1,30 @@
-import requests
+import logging
 from typing import Optional, Dict
-from bs4 import BeautifulSoup
-import json
+from app.services.cache import cached, FUNDAMENTALS, SEARCH
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.http_client import PROVIDER_ERRORS, http_pool
+from app.utils.numbers import percent_to_fraction
+
+logger = logging.getLogger(__name__)
 
 class Investidor10Service:
     BASE_URL = "https://www.investidor10.com.br"
-    
+
     @staticmethod
-    def get_stock_data(ticker: str) -> Optional[Dict]:
+    @cached("investidor10:stock", FUNDAMENTALS)
+    async def get_stock_data(ticker: str) -> Optional[Dict]:
         """
         Fetch stock data from Investidor10
         """
         try:
             # Remove .SA if present for Investidor10 API
             clean_ticker = ticker.replace(".SA", "")
-            
+
             # Try to fetch from Investidor10 API or website
             url = f"{Investidor10Service.BASE_URL}/api/quote/{clean_ticker}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, provider="investidor10")
+
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -32,42 +32,36 @@ class Investidor10Service:
                     "ticker": clean_ticker,
                     "price": data.get("price"),
                     "pe_ratio": data.get("peRatio"),
-                    "dividend_yield": data.get("dividendYield"),
-                    "roe": data.get("roe"),
-                    "net_margin": data.get("netMargin"),
+                    "dividend_yield": percent_to_fraction(data.get("dividendYield")),
+                    "roe": percent_to_fraction(data.get("roe")),
+                    "net_margin": percent_to_fraction(data.get("netMargin")),
                     "debt_ratio": data.get("debtRatio"),
                     "growth_rate": data.get("growthRate"),
                     "recommendation": data.get("recommendation"),
                     "rating": data.get("rating"),
                 }
-            
-            # Fallback: return minimal data indicating source is available
-            return {
-                "source": "investidor10",
-                "ticker": clean_ticker,
-                "link": f"{Investidor10Service.BASE_URL}/acoes/{clean_ticker}/",
-                "note": "Detailed data available on Investidor10"
-            }
-            
-        except Exception as e:
-            print(f"Error fetching Investidor10 data for {ticker}: {e}")
+
+            # Respostas de erro (429, 5xx) não são cacheadas
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error fetching Investidor10 data for %s: %s", ticker, e)
             return None
 
     @staticmethod
-    def search_stocks(query: str) -> list:
+    @cached("investidor10:search", SEARCH)
+    async def search_stocks(query: str) -> Optional[list]:
         """
         Search stocks on Investidor10
         """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            }
-            
             url = f"{Investidor10Service.BASE_URL}/api/search"
             params = {"q": query}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, params=params, provider="investidor10")
+
             if response.status_code == 200:
                 results = response.json()
                 return [
@@ -79,29 +73,27 @@ class Investidor10Service:
                     }
                     for r in results[:10]
                 ]
-            return []
-            
-        except Exception as e:
-            print(f"Error searching Investidor10 for {query}: {e}")
-            return []
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error searching Investidor10 for %s: %s", query, e)
+            return None
 
     @staticmethod
-    def get_fii_data(fii_ticker: str) -> Optional[Dict]:
+    @cached("investidor10:fii", FUNDAMENTALS)
+    async def get_fii_data(fii_ticker: str) -> Optional[Dict]:
         """
         Fetch FII (Fundo de Investimento Imobiliário) data
         """
         try:
             clean_ticker = fii_ticker.replace(".SA", "")
-            
+
             url = f"{Investidor10Service.BASE_URL}/api/fiis/{clean_ticker}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, provider="investidor10")
+
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -109,19 +101,16 @@ class Investidor10Service:
                     "ticker": clean_ticker,
                     "type": "FII",
                     "price": data.get("price"),
-                    "dividend_yield": data.get("dividendYield"),
+                    "dividend_yield": percent_to_fraction(data.get("dividendYield")),
                     "pvp_ratio": data.get("pvpRatio"),
                     "distribution": data.get("distribution"),
                     "link": f"{Investidor10Service.BASE_URL}/fiis/{clean_ticker}/"
                 }
-            
-            return {
-                "source": "investidor10",
-                "ticker": clean_ticker,
-                "type": "FII",
-                "link": f"{Investidor10Service.BASE_URL}/fiis/{clean_ticker}/"
-            }
-            
-        except Exception as e:
-            print(f"Error fetching FII data from Investidor10 for {fii_ticker}: {e}")
+
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error fetching FII data from Investidor10 for %s: %s", fii_ticker, e)
             return None
@@ -0,0 +1,30 @@
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = Path(__file__).resolve().parents[2] / "data.json"
+
+
+@lru_cache(maxsize=1)
+def load_local_assets() -> List[Dict]:
+    """
+    Assets bundled in backend/data.json (fundamentals + monthly history).
+    """
+    try:
+        with open(DATA_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.error("%s não encontrado", DATA_PATH)
+        return []
+
+
+def get_local_asset(ticker: str) -> Optional[Dict]:
+    ticker = ticker.upper().replace(".SA", "")
+    for asset in load_local_assets():
+        if asset.get("ticker") == ticker:
+            return asset
+    return None
@@ -0,0 +1,128 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests by route template.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "API requests being served.")
+PROVIDER_LATENCY = Histogram(
+    "provider_request_duration_seconds",
+    "Latency of upstream provider calls.",
+    ["provider", "outcome"],
+)
+PROVIDER_ERRORS = Counter(
+    "provider_errors_total",
+    "Failed or rejected upstream provider calls.",
+    ["provider", "kind"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of individual SQL statements.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL while serving one request.",
+    ["route"],
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time from submitting a bcrypt hash/verify to its result, queueing included.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_PENDING = Gauge("password_hash_pending", "Hash/verify calls queued or running.")
+PASSWORD_HASH_REJECTED = Counter("password_hash_rejected_total", "Hash/verify calls refused with 429.")
+
+# [consultas, segundos] da requisição corrente; lista mutável para que
+# threads do threadpool (cópias do contexto) somem no mesmo objeto
+request_db_stats: ContextVar[Optional[List]] = ContextVar("request_db_stats", default=None)
+
+
+def observe_provider_call(provider: str, outcome: str, seconds: float) -> None:
+    PROVIDER_LATENCY.labels(provider, outcome).observe(seconds)
+    if outcome != "ok":
+        PROVIDER_ERRORS.labels(provider, outcome).inc()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Times every statement of a sync engine (or the sync core of an async
+    one) and adds it to the current request's DB counters.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+
+class CacheCollector:
+    """
+    Exposes the counters the cache and single-flight already keep
+    (the same numbers as /health) at scrape time.
+    """
+
+    def __init__(self, cache, singleflight):
+        self.cache = cache
+        self.singleflight = singleflight
+
+    def collect(self):
+        lookups = CounterMetricFamily("cache_lookups", "Quote cache lookups by result.", labels=["result"])
+        stats = self.cache.stats
+        lookups.add_metric(["hit"], stats.hits)
+        lookups.add_metric(["stale"], stats.stale_hits)
+        lookups.add_metric(["miss"], stats.misses)
+        yield lookups
+        yield CounterMetricFamily("cache_redis_hits", "Entries read from Redis.", value=stats.redis_hits)
+        yield CounterMetricFamily("cache_redis_errors", "Failed Redis operations.", value=stats.redis_errors)
+        yield CounterMetricFamily("cache_refreshes", "Background stale refreshes.", value=stats.refreshes)
+        ratio = stats.as_dict()["hit_ratio"]
+        yield GaugeMetricFamily("cache_hit_ratio", "Share of lookups served from cache.", value=ratio or 0.0)
+        flights = CounterMetricFamily("singleflight_calls", "Single-flight calls by role.", labels=["role"])
+        for role, value in self.singleflight.stats.as_dict().items():
+            flights.add_metric([role], value)
+        yield flights
+
+
+class PoolCollector:
+    """
+    Connection pool saturation per engine: checked-out connections against
+    pool size plus overflow.
+    """
+
+    def __init__(self, engines: Dict[str, Engine]):
+        self.engines = engines
+
+    def collect(self):
+        for name, doc, attr in (
+            ("db_pool_size", "Configured pool size.", "size"),
+            ("db_pool_checked_out", "Connections in use.", "checkedout"),
+            ("db_pool_overflow", "Connections opened beyond the pool size.", "overflow"),
+        ):
+            gauge = GaugeMetricFamily(name, doc, labels=["engine"])
+            for label, engine in self.engines.items():
+                method = getattr(engine.pool, attr, None)
+                if method is not None:
+                    gauge.add_metric([label], method())
+            yield gauge
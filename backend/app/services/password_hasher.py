@@ -0,0 +1,93 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.services.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_PENDING, PASSWORD_HASH_REJECTED
+from app.utils.security import get_password_hash, verify_and_update
+
+
+def _ready() -> bool:
+    return True
+
+
+class HasherBusyError(Exception):
+    """
+    Raised instead of queueing a hash when the pool's backlog is full.
+    """
+
+
+class PasswordHasher:
+    """
+    bcrypt off the event loop and off the AnyIO threadpool: a small
+    dedicated process pool, so a login burst competes for its own workers
+    instead of the threads (and the GIL) every other endpoint uses. At most
+    `max_pending` calls are queued or running; beyond that callers get
+    HasherBusyError (429) rather than an ever-growing wait.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: não herda threads nem o event loop do processo da API
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def start(self) -> None:
+        """
+        Spawns every worker up front (one no-op each) so the first logins
+        after startup do not pay the process-spawn cost.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(self.workers)))
+
+    async def _run(self, operation: str, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise HasherBusyError(f"{self.pending} operações de hash pendentes")
+        self.pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+            PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        (valid, new_hash): new_hash is set when the stored hash should be
+        replaced, e.g. after BCRYPT_ROUNDS changed.
+        """
+        return await self._run("verify", verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def as_dict(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+from redis.exceptions import RedisError
+from app.config import settings
+from app.services.redis_client import get_redis
+from app.services.yahoo_service import YahooService
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "prices"
+
+
+def quote_changed(old: Optional[Dict], new: Dict) -> bool:
+    return old is None or old.get("price") != new.get("price") or old.get("change_percent") != new.get("change_percent")
+
+
+class PriceFeed:
+    """
+    Live prices pushed to subscribers. A single background loop refreshes
+    every watched ticker through YahooService (one batched download per
+    interval) and fans changed quotes out to the queue of each subscriber,
+    so upstream load depends on the watched tickers, not on the number of
+    clients. With PRICE_FEED_REDIS on, each ticker is fetched by one worker
+    per interval (SET NX claim) and updates travel over Redis pub/sub to
+    the subscribers of every worker.
+    """
+
+    def __init__(self, interval: float, queue_size: int, use_redis: bool):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.use_redis = use_redis
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._last: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def new_queue(self) -> asyncio.Queue:
+        return asyncio.Queue(maxsize=self.queue_size)
+
+    def watched(self) -> List[str]:
+        return sorted(t for t, queues in self._subscribers.items() if queues)
+
+    def subscribe(self, queue: asyncio.Queue, tickers: Iterable[str]) -> List[Dict]:
+        """
+        Adds the queue to the tickers' fan-out and returns their last known
+        quotes so the client has something to show immediately.
+        """
+        snapshot = []
+        new_ticker = False
+        for ticker in tickers:
+            queues = self._subscribers.setdefault(ticker, set())
+            new_ticker |= not queues
+            queues.add(queue)
+            if ticker in self._last:
+                snapshot.append(self._last[ticker])
+        if new_ticker and self._wakeup is not None:
+            self._wakeup.set()
+        return snapshot
+
+    def unsubscribe(self, queue: asyncio.Queue, tickers: Optional[Iterable[str]] = None) -> None:
+        for ticker in list(tickers if tickers is not None else self._subscribers):
+            queues = self._subscribers.get(ticker)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[ticker]
+                self._last.pop(ticker, None)
+
+    def publish_local(self, quote: Dict) -> None:
+        ticker = quote.get("ticker")
+        if ticker not in self._subscribers or not quote_changed(self._last.get(ticker), quote):
+            return
+        self._last[ticker] = quote
+        for queue in self._subscribers.get(ticker, ()):
+            self.offer(queue, quote)
+
+    @staticmethod
+    def offer(queue: asyncio.Queue, message: Dict) -> None:
+        if queue.full():
+            # Cliente lento: descarta a atualização mais antiga
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def _claim(self, tickers: List[str]) -> List[str]:
+        if not self.use_redis or not tickers:
+            return tickers
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for ticker in tickers:
+                    pipe.set(f"feed:poll:{ticker}", "1", nx=True, px=int(self.interval * 1000))
+                claimed = await pipe.execute()
+        except (RedisError, OSError) as exc:
+            logger.warning("Redis indisponível para o feed de preços: %s", exc)
+            return tickers
+        return [t for t, ok in zip(tickers, claimed) if ok]
+
+    async def _publish(self, quotes: Iterable[Dict]) -> None:
+        if not self.use_redis:
+            for quote in quotes:
+                self.publish_local(quote)
+            return
+        try:
+            redis = get_redis()
+            for quote in quotes:
+                await redis.publish(CHANNEL, json.dumps(quote))
+        except (RedisError, OSError) as exc:
+            logger.warning("Falha ao publicar preços no Redis: %s", exc)
+            for quote in quotes:
+                self.publish_local(quote)
+
+    async def poll_once(self) -> None:
+        tickers = await self._claim(self.watched())
+        if not tickers:
+            return
+        # Direto do provedor: o cache de preços pode servir valores vencidos
+        quotes = await YahooService.get_quotes(tickers, fresh=True)
+        await self._publish(quotes.values())
+
+    async def _poll_loop(self) -> None:
+        while True:
+            # Limpa antes da busca: um subscribe durante a busca não se perde
+            self._wakeup.clear()
+            try:
+                await self.poll_once()
+            except Exception as exc:
+                logger.warning("Falha ao atualizar o feed de preços: %s", exc)
+            try:
+                # Novos tickers são buscados na hora; os demais a cada intervalo
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _listen_loop(self) -> None:
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.publish_local(json.loads(message["data"]))
+            except (RedisError, OSError) as exc:
+                logger.warning("Assinatura do feed no Redis caiu: %s", exc)
+                await asyncio.sleep(self.interval)
+            finally:
+                await pubsub.close()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+        if self.use_redis:
+            self._tasks.append(asyncio.create_task(self._listen_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+price_feed = PriceFeed(
+    interval=settings.PRICE_FEED_INTERVAL_SECONDS,
+    queue_size=settings.PRICE_FEED_QUEUE_SIZE,
+    use_redis=settings.PRICE_FEED_REDIS,
+)
@@ -0,0 +1,196 @@
+import io
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+import yfinance as yf
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import Symbol
+from app.services.calibration_service import CalibrationService
+from app.services.local_data import load_local_assets
+from app.services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+STAGING_DDL = """
+CREATE TEMP TABLE prices_staging (
+    symbol_id integer NOT NULL,
+    date timestamp NOT NULL,
+    close double precision,
+    volume bigint
+) ON COMMIT DROP
+"""
+
+UPSERT_SQL = """
+INSERT INTO prices (symbol_id, date, close, volume)
+SELECT symbol_id, date, close, volume FROM prices_staging
+ON CONFLICT (symbol_id, date) DO UPDATE
+SET close = EXCLUDED.close, volume = EXCLUDED.volume
+"""
+
+# Barras novas ou alteradas em datas já calibradas invalidam as somas
+# acumuladas; zeradas aqui, são recalculadas do zero por refresh_all
+RESET_CALIBRATIONS_SQL = """
+UPDATE calibrations c
+SET last_price_date = NULL, last_close = NULL, n_returns = 0,
+    sum_log_return = 0, sum_sq_log_return = 0
+WHERE EXISTS (
+    SELECT 1
+    FROM prices_staging st
+    LEFT JOIN prices p ON p.symbol_id = st.symbol_id AND p.date = st.date
+    WHERE st.symbol_id = c.symbol_id
+      AND st.date <= c.last_price_date
+      AND p.close IS DISTINCT FROM st.close
+)
+"""
+
+UPDATE_LAST_DATE_SQL = """
+UPDATE symbols s
+SET last_price_date = GREATEST(COALESCE(s.last_price_date, l.last_date), l.last_date)
+FROM (SELECT symbol_id, max(date) AS last_date FROM prices_staging GROUP BY symbol_id) l
+WHERE s.id = l.symbol_id
+"""
+
+ENSURE_PARTITIONS_SQL = """
+SELECT ensure_price_partition(m::date)
+FROM generate_series(
+    date_trunc('month', (SELECT min(date) FROM prices_staging)),
+    date_trunc('month', (SELECT max(date) FROM prices_staging)),
+    interval '1 month'
+) AS m
+"""
+
+
+def prices_partitioned(cursor) -> bool:
+    # A migração 0002 (opcional) cria a função que abre partições mensais
+    cursor.execute("SELECT to_regproc('ensure_price_partition') IS NOT NULL")
+    return cursor.fetchone()[0]
+
+
+def ensure_symbols(db: Session, tickers: Iterable[str]) -> None:
+    """
+    Registers tickers missing from the symbols table.
+    """
+    tickers = {t.strip().upper().replace(".SA", "") for t in tickers if t.strip()}
+    if not tickers:
+        return
+    existing = {t for (t,) in db.query(Symbol.ticker).filter(Symbol.ticker.in_(tickers))}
+    local = {a["ticker"]: a for a in load_local_assets()}
+    for ticker in sorted(tickers - existing):
+        asset = local.get(ticker, {})
+        asset_type = "fii" if asset.get("setor") == "Fundo Imobiliário" else "acao"
+        db.add(Symbol(ticker=ticker, name=asset.get("empresa"), asset_type=asset_type))
+    db.commit()
+
+
+def download_batch(tickers: List[str], start: datetime) -> pd.DataFrame:
+    """
+    Daily OHLCV for a batch of tickers in one yf.download call, returned in
+    long format (ticker, date, close, volume).
+    """
+    symbols = [f"{t}.SA" for t in tickers]
+    frame = yf.download(
+        tickers=" ".join(symbols),
+        start=start.strftime("%Y-%m-%d"),
+        interval="1d",
+        group_by="ticker",
+        auto_adjust=False,
+        progress=False,
+        threads=True,
+    )
+    if frame.empty:
+        return pd.DataFrame(columns=["ticker", "date", "close", "volume"])
+
+    if len(symbols) == 1:
+        frame = pd.concat({symbols[0]: frame}, axis=1)
+    long = (
+        frame.stack(level=0)
+        .rename_axis(["date", "ticker"])
+        .reset_index()[["ticker", "date", "Close", "Volume"]]
+        .rename(columns={"Close": "close", "Volume": "volume"})
+        .dropna(subset=["close"])
+    )
+    long["ticker"] = long["ticker"].str.replace(".SA", "", regex=False)
+    long["volume"] = long["volume"].fillna(0).astype("int64")
+    return long
+
+
+def copy_prices(db: Session, rows: pd.DataFrame, symbol_ids: Dict[str, int]) -> int:
+    """
+    Bulk upsert: COPY the batch into a temp staging table, then a single
+    INSERT ... ON CONFLICT merges it into prices and advances
+    symbols.last_price_date. Calibrations whose already-processed dates
+    receive new or changed closes are reset for a full recompute.
+    """
+    rows = rows.assign(symbol_id=rows["ticker"].map(symbol_ids)).dropna(subset=["symbol_id"])
+    if rows.empty:
+        return 0
+    buffer = io.StringIO()
+    rows[["symbol_id", "date", "close", "volume"]].astype({"symbol_id": "int64"}).to_csv(
+        buffer, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S"
+    )
+    buffer.seek(0)
+
+    connection = db.connection().connection
+    with connection.cursor() as cursor:
+        cursor.execute(STAGING_DDL)
+        cursor.copy_expert("COPY prices_staging (symbol_id, date, close, volume) FROM STDIN WITH (FORMAT csv)", buffer)
+        if prices_partitioned(cursor):
+            cursor.execute(ENSURE_PARTITIONS_SQL)
+        cursor.execute(RESET_CALIBRATIONS_SQL)
+        cursor.execute(UPSERT_SQL)
+        cursor.execute(UPDATE_LAST_DATE_SQL)
+    db.commit()
+    return len(rows)
+
+
+def ingest_prices(
+    db: Session,
+    tickers: Optional[Iterable[str]] = None,
+    years: int = 5,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Incremental ingestion for the whole symbols table (or the given tickers).
+    Symbols are ordered by their last ingested bar so each batch downloads
+    from roughly the same start date; overlapping bars are upserted.
+    """
+    if tickers:
+        ensure_symbols(db, tickers)
+    elif db.query(Symbol.id).first() is None:
+        ensure_symbols(db, (a["ticker"] for a in load_local_assets()))
+
+    query = db.query(Symbol.id, Symbol.ticker, Symbol.last_price_date)
+    if tickers:
+        query = query.filter(Symbol.ticker.in_([t.strip().upper().replace(".SA", "") for t in tickers]))
+    symbols = sorted(query.all(), key=lambda s: s.last_price_date or datetime.min)
+
+    batch_size = batch_size or settings.INGESTION_BATCH_SIZE
+    default_start = datetime.utcnow() - timedelta(days=365 * years)
+    total = 0
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        starts = [s.last_price_date + timedelta(days=1) for s in batch if s.last_price_date]
+        start = min(starts) if len(starts) == len(batch) else default_start
+        try:
+            rows = download_batch([s.ticker for s in batch], start)
+        except Exception as e:
+            logger.warning("Falha ao baixar lote %s: %s", [s.ticker for s in batch], e)
+            continue
+        total += copy_prices(db, rows, {s.ticker: s.id for s in batch})
+        logger.info("Lote %d/%d: %d barras", i // batch_size + 1, -(-len(symbols) // batch_size), len(rows))
+
+    CalibrationService.refresh_all(db)
+    price_store.refresh(db, [s.ticker for s in symbols])
+    return total
+
+
+def run_ingestion_job(tickers: Optional[Iterable[str]] = None, years: int = 5) -> int:
+    from app.models.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return ingest_prices(db, tickers=tickers, years=years)
+    finally:
+        db.close()
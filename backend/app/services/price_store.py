@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.repositories.price_repository import PriceRepository
+from app.services.local_data import get_local_asset
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("dates", "close", "volume")
+DateLike = Union[date, datetime, str, np.datetime64, None]
+
+
+def to_day(value: DateLike) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    return np.datetime64(value, "D")
+
+
+def bars_per_year(dates: np.ndarray) -> float:
+    """
+    Observed sampling frequency: ~252 for daily bars, 12 for data.json.
+    """
+    years = max((dates[-1] - dates[0]).astype(np.int64) / 365.25, 1 / 365.25)
+    return (len(dates) - 1) / years
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """
+    Contiguous per-symbol columns: dates (datetime64[D]), close (float64)
+    and volume (int64). Slices returned by `window` are views, not copies.
+    """
+    dates: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def window(self, start: DateLike = None, end: DateLike = None) -> "PriceSeries":
+        lo = 0 if start is None else int(np.searchsorted(self.dates, to_day(start), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, to_day(end), side="left"))
+        return PriceSeries(self.dates[lo:hi], self.close[lo:hi], self.volume[lo:hi])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def build_series(dates, close, volume) -> PriceSeries:
+    return PriceSeries(
+        dates=np.ascontiguousarray(np.asarray(dates, dtype="datetime64[D]")),
+        close=np.ascontiguousarray(np.asarray(close, dtype=np.float64)),
+        volume=np.ascontiguousarray(np.asarray([v or 0 for v in volume], dtype=np.int64)),
+    )
+
+
+def local_series(ticker: str) -> Optional[PriceSeries]:
+    """
+    Monthly history from data.json, dated at month starts ending this month.
+    """
+    asset = get_local_asset(ticker)
+    history = (asset or {}).get("history") or []
+    if not history:
+        return None
+    last = np.datetime64(date.today(), "M")
+    months = np.arange(last - len(history) + 1, last + 1)
+    return build_series(months.astype("datetime64[D]"), history, [0] * len(history))
+
+
+class PriceStore:
+    """
+    Process-wide columnar price store. Series are loaded once from the
+    prices table (or data.json) and analytics read zero-copy windows from
+    them. With PRICE_STORE_DIR set, columns are persisted as .npy files and
+    opened with mmap, so every uvicorn worker shares the same page cache
+    instead of holding its own copy. The files are written by a background
+    thread, since loads may run on the event loop (AsyncSession.run_sync);
+    until a write lands the worker serves its in-memory copy. The monthly
+    data.json fallback is kept apart from the daily series.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self._series: Dict[str, PriceSeries] = {}
+        self._fallback: Dict[str, PriceSeries] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._pending: Dict[str, PriceSeries] = {}
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-store")
+
+    def _path(self, ticker: str, column: str) -> Path:
+        return self.directory / f"{ticker}.{column}.npy"
+
+    def _write(self, ticker: str, series: PriceSeries) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for column in COLUMNS:
+            path = self._path(ticker, column)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, getattr(series, column))
+            os.replace(tmp, path)
+
+    def _flush(self, ticker: str, series: PriceSeries) -> None:
+        try:
+            self._write(ticker, series)
+        except OSError as exc:
+            # Sem o arquivo este worker segue com a cópia em memória
+            logger.warning("Falha ao gravar a série de %s: %s", ticker, exc)
+            return
+        with self._lock:
+            # Só libera o mapeamento se nenhuma versão mais nova foi enfileirada
+            if self._pending.get(ticker) is series:
+                del self._pending[ticker]
+                self._mtimes.pop(ticker, None)
+
+    def _open_mapped(self, ticker: str) -> Optional[PriceSeries]:
+        pending = self._pending.get(ticker)
+        if pending is not None:
+            return pending
+        close_path = self._path(ticker, "close")
+        try:
+            mtime = close_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        cached = self._series.get(ticker)
+        if cached is not None and self._mtimes.get(ticker) == mtime:
+            return cached
+        try:
+            series = PriceSeries(*(np.load(self._path(ticker, c), mmap_mode="r") for c in COLUMNS))
+        except (FileNotFoundError, ValueError):
+            return None
+        self._series[ticker] = series
+        self._mtimes[ticker] = mtime
+        return series
+
+    def put(self, ticker: str, series: PriceSeries) -> PriceSeries:
+        with self._lock:
+            self._series[ticker] = series
+            if self.directory is not None:
+                self._pending[ticker] = series
+        if self.directory is not None:
+            self._writer.submit(self._flush, ticker, series)
+        return series
+
+    def load_from_db(self, db: Session, tickers: Iterable[str]) -> Dict[str, PriceSeries]:
+        """
+        (Re)loads full series for the given tickers with one window query.
+        """
+        loaded = {}
+        for ticker, columns in PriceRepository.get_window(db, tickers).items():
+            loaded[ticker] = self.put(ticker, build_series(columns["dates"], columns["close"], columns["volume"]))
+        return loaded
+
+    def refresh(self, db: Session, tickers: Iterable[str]) -> None:
+        """
+        Called after ingestion: with a directory every ticker is rewritten so
+        other workers remap it; in memory only already loaded tickers are.
+        """
+        tickers = list(tickers)
+        if self.directory is None:
+            tickers = [t for t in tickers if t in self._series]
+        if tickers:
+            self.load_from_db(db, tickers)
+
+    def get(self, ticker: str, db: Optional[Session] = None, fallback: bool = True) -> Optional[PriceSeries]:
+        """
+        Daily series from the store or the database; with `fallback`, the
+        monthly data.json history when neither has the ticker.
+        """
+        ticker = ticker.strip().upper().replace(".SA", "")
+        series = self._open_mapped(ticker) if self.directory is not None else None
+        if series is None:
+            series = self._series.get(ticker)
+        if series is not None:
+            return series
+        if db is not None:
+            series = self.load_from_db(db, [ticker]).get(ticker)
+            if series is not None:
+                return series
+        if not fallback:
+            return None
+        if ticker not in self._fallback:
+            self._fallback[ticker] = local_series(ticker)
+        return self._fallback[ticker]
+
+    def window(self, ticker: str, start: DateLike = None, end: DateLike = None,
+               db: Optional[Session] = None, fallback: bool = True) -> Optional[PriceSeries]:
+        series = self.get(ticker, db, fallback)
+        return series.window(start, end) if series is not None else None
+
+    def matrix(self, tickers: Iterable[str], start: DateLike = None, end: DateLike = None,
+               db: Optional[Session] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """
+        Closes of many tickers aligned on the union of their dates:
+        (dates (T,), tickers found, close (T, N)). Gaps are forward filled;
+        dates before a ticker's first bar stay NaN. Tickers not yet loaded
+        are read from the database with a single window query. Monthly
+        data.json histories are only used when no ticker has daily bars,
+        so the matrix never mixes frequencies.
+        """
+        tickers = [t.strip().upper().replace(".SA", "") for t in tickers]
+        if db is not None:
+            missing = [t for t in tickers if t not in self._series]
+            if self.directory is not None:
+                missing = [t for t in missing if self._open_mapped(t) is None]
+            if missing:
+                self.load_from_db(db, missing)
+        found = {}
+        for fallback in (False, True):
+            for ticker in tickers:
+                series = self.window(ticker, start, end, fallback=fallback)
+                if series is not None and len(series):
+                    found[ticker] = series
+            if found:
+                break
+        if not found:
+            return np.empty(0, dtype="datetime64[D]"), [], np.empty((0, 0))
+
+        dates = np.unique(np.concatenate([series.dates for series in found.values()]))
+        close = np.full((len(dates), len(found)), np.nan)
+        for column, series in enumerate(found.values()):
+            close[np.searchsorted(dates, series.dates), column] = series.close
+        # Forward fill: cada linha aponta para a última observação válida
+        rows = np.where(np.isnan(close), 0, np.arange(len(dates))[:, None])
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        close = close[rows, np.arange(len(found))]
+        return dates, list(found), close
+
+
+price_store = PriceStore(settings.PRICE_STORE_DIR or None)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Set, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import User
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Tempo que o Redis fica indisponível antes de tentarmos de novo
+REDIS_RETRY_SECONDS = 30
+# Colunas que, ao mudar, tornam o principal em cache inválido
+PRINCIPAL_FIELDS = ("email", "is_active", "subscription_plan", "risk_profile", "objective", "token_version")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    What authenticated endpoints need to know about the caller, small
+    enough to cache instead of loading the users row on every request.
+    """
+    user_id: str
+    email: str
+    is_active: bool
+    subscription_plan: str
+    risk_profile: Optional[str] = None
+    objective: Optional[str] = None
+    token_version: int = 0
+
+    @staticmethod
+    def from_user(user: User) -> "Principal":
+        return Principal(
+            user_id=user.user_id,
+            email=user.email,
+            is_active=bool(user.is_active),
+            subscription_plan=user.subscription_plan or "free",
+            risk_profile=user.risk_profile,
+            objective=user.objective,
+            token_version=user.token_version or 0,
+        )
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @staticmethod
+    def loads(raw: str) -> "Principal":
+        return Principal(**json.loads(raw))
+
+
+@dataclass
+class PrincipalCacheStats:
+    hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class PrincipalCache:
+    """
+    Authenticated principals keyed by token subject and token version.
+
+    The in-process LRU holds entries for PRINCIPAL_LOCAL_TTL_SECONDS, which
+    bounds how long another worker can serve a principal after it was
+    invalidated; Redis keeps one hash per subject (field = token version)
+    so invalidating a user is a single DEL whatever versions are cached.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.stats = PrincipalCacheStats()
+        self._lru: "OrderedDict[Tuple[str, int], Tuple[Principal, float]]" = OrderedDict()
+        self._redis_down_until = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, exc: Exception) -> None:
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning("Redis indisponível para o cache de usuários: %s", exc)
+
+    def _lru_set(self, principal: Principal) -> None:
+        key = (principal.email, principal.token_version)
+        self._lru[key] = (principal, time.monotonic() + settings.PRINCIPAL_LOCAL_TTL_SECONDS)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    async def get(self, subject: str, version: int) -> Optional[Principal]:
+        cached = self._lru.get((subject, version))
+        if cached is not None and cached[1] > time.monotonic():
+            self._lru.move_to_end((subject, version))
+            self.stats.hits += 1
+            return cached[0]
+        if self._redis_available():
+            try:
+                raw = await get_redis().hget(f"principal:{subject}", str(version))
+            except (RedisError, OSError) as exc:
+                self._redis_failed(exc)
+                raw = None
+            if raw is not None:
+                principal = Principal.loads(raw)
+                self._lru_set(principal)
+                self.stats.redis_hits += 1
+                return principal
+        self.stats.misses += 1
+        return None
+
+    async def set(self, principal: Principal) -> None:
+        self._lru_set(principal)
+        if not self._redis_available():
+            return
+        key = f"principal:{principal.email}"
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.hset(key, str(principal.token_version), principal.dumps())
+                pipe.expire(key, settings.PRINCIPAL_REDIS_TTL_SECONDS)
+                await pipe.execute()
+        except (RedisError, OSError) as exc:
+            self._redis_failed(exc)
+
+    def drop_local(self, subject: str) -> None:
+        for key in [key for key in self._lru if key[0] == subject]:
+            del self._lru[key]
+
+    async def invalidate(self, *subjects: str) -> None:
+        """
+        Forgets the cached principals of `subjects` (every token version),
+        locally and in Redis. Call after changing a user or their plan.
+        """
+        for subject in subjects:
+            self.drop_local(subject)
+            self.stats.invalidations += 1
+        if not subjects or not self._redis_available():
+            return
+        try:
+            await get_redis().delete(*(f"principal:{subject}" for subject in subjects))
+        except (RedisError, OSError) as exc:
+            self._redis_failed(exc)
+
+    def invalidate_soon(self, subjects: Set[str]) -> None:
+        """
+        Invalidation from synchronous code: the local entries go at once,
+        the Redis DEL runs on the event loop when there is one.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            for subject in subjects:
+                self.drop_local(subject)
+            logger.warning("Usuários alterados fora do event loop; Redis expira em %ss", settings.PRINCIPAL_REDIS_TTL_SECONDS)
+            return
+        task = loop.create_task(self.invalidate(*subjects))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_users(session: Session, flush_context) -> None:
+    changed = session.info.setdefault("changed_principals", set())
+    for user in list(session.dirty) + list(session.deleted):
+        if not isinstance(user, User):
+            continue
+        attrs = inspect(user).attrs
+        if user in session.deleted or any(attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+            changed.add(user.email)
+            # O e-mail antigo também é chave de cache
+            changed.update(email for email in attrs.email.history.deleted if email)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_users(session: Session) -> None:
+    changed = session.info.pop("changed_principals", None)
+    if changed:
+        principal_cache.invalidate_soon(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_users(session: Session) -> None:
+    session.info.pop("changed_principals", None)
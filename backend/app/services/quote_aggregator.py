@@ -0,0 +1,221 @@
+import asyncio
+from typing import Awaitable, Dict, List, Optional
+from app.config import settings
+from app.services.circuit_breaker import breakers
+from app.services.yahoo_service import YahooService
+from app.services.investidor10_service import Investidor10Service
+from app.services.status_invest_service import StatusInvestService
+from app.services.scheduler import FII, STOCK, refresh_scheduler
+
+
+def normalize_ticker(ticker: str) -> str:
+    return ticker.strip().upper().replace(".SA", "")
+
+
+async def gather_with_deadline(calls: Dict[str, Awaitable], deadline: float) -> Dict[str, Optional[Dict]]:
+    """
+    Runs the provider calls concurrently and returns whatever finished before
+    the deadline. Providers that did not answer in time map to None.
+    """
+    tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+    if not tasks:
+        return {}
+    await asyncio.wait(tasks.values(), timeout=deadline)
+
+    results = {}
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            results[name] = None
+        elif task.cancelled() or task.exception() is not None:
+            results[name] = None
+        else:
+            results[name] = task.result()
+    return results
+
+
+async def bounded(semaphore: asyncio.Semaphore, call: Awaitable):
+    async with semaphore:
+        return await call
+
+
+def source_call(method, *args) -> Awaitable:
+    """
+    Calls a cached provider method, or only reads its cache while the
+    provider's circuit breaker is open.
+    """
+    if breakers.is_open(method.provider):
+        return method.peek(*args)
+    return method(*args)
+
+
+def fresh_field(data: Optional[Dict], name: str):
+    if not data or name in data.get('stale_fields', ()):
+        return None
+    return data.get(name)
+
+
+def consolidate_quote(ticker_clean: str, yahoo_data, investidor10_data, status_invest_data) -> Dict:
+    ticker_sa = f"{ticker_clean}.SA"
+
+    # Consolidar preço (prioridade: Yahoo > Status > Investidor10)
+    # Preços de scrapers cacheados além do TTL de preço não entram na consolidação
+    price = None
+    if yahoo_data and yahoo_data.get('price'):
+        price = yahoo_data['price']
+    elif fresh_field(status_invest_data, 'price'):
+        price = status_invest_data['price']
+    elif fresh_field(investidor10_data, 'price'):
+        price = investidor10_data['price']
+
+    # Consolidar dividend yield
+    dividend_yield = None
+    if yahoo_data and yahoo_data.get('dividend_yield'):
+        dividend_yield = yahoo_data['dividend_yield']
+    elif investidor10_data and investidor10_data.get('dividend_yield'):
+        dividend_yield = investidor10_data['dividend_yield']
+    elif status_invest_data and status_invest_data.get('dividend_yield'):
+        dividend_yield = status_invest_data['dividend_yield']
+
+    # Calcular variação percentual (se disponível)
+    change_percent = None
+    if yahoo_data and 'change_percent' in yahoo_data:
+        change_percent = yahoo_data['change_percent']
+
+    return {
+        "ticker": ticker_clean,
+        "price": price,
+        "change_percent": change_percent,
+        "dividend_yield": dividend_yield,
+        "currency": yahoo_data.get('currency') if yahoo_data else 'BRL',
+        "yahoo": yahoo_data,
+        "investidor10": investidor10_data,
+        "status_invest": status_invest_data,
+        "links": {
+            "google_finance": f"https://www.google.com/finance/quote/{ticker_clean}:BVMF",
+            "yahoo_finance": f"https://finance.yahoo.com/quote/{ticker_sa}",
+            "investidor10": f"https://www.investidor10.com.br/acoes/{ticker_clean}/",
+            "status_invest": f"https://www.statusinvest.com.br/acoes/{ticker_clean}"
+        }
+    }
+
+
+class QuoteAggregator:
+    @staticmethod
+    async def get_quote(ticker: str, deadline: Optional[float] = None) -> Dict:
+        """
+        Queries Yahoo, Investidor10 and Status Invest concurrently and
+        consolidates whatever answered before the deadline.
+        """
+        ticker_clean = normalize_ticker(ticker)
+        refresh_scheduler.touch(ticker_clean, STOCK)
+        results = await gather_with_deadline(
+            {
+                "yahoo": source_call(YahooService.get_quote, ticker_clean),
+                "investidor10": source_call(Investidor10Service.get_stock_data, ticker_clean),
+                "status_invest": source_call(StatusInvestService.get_stock_data, ticker_clean),
+            },
+            deadline or settings.QUOTE_DEADLINE_SECONDS,
+        )
+
+        if not any(results.values()):
+            return {"error": "Quote not found in any source", "ticker": ticker_clean}
+
+        consolidated = consolidate_quote(
+            ticker_clean, results["yahoo"], results["investidor10"], results["status_invest"]
+        )
+        consolidated["partial"] = not all(results.values())
+        consolidated["missing_sources"] = [name for name, data in results.items() if data is None]
+        consolidated["open_circuits"] = [name for name in results if breakers.is_open(name)]
+        return consolidated
+
+    @staticmethod
+    async def get_quotes(tickers: List[str], deadline: Optional[float] = None) -> Dict:
+        """
+        Consolidated quotes for many tickers: one multi-ticker Yahoo download
+        plus scraper calls deduplicated per ticker and capped at
+        PROVIDER_CONCURRENCY in flight.
+        """
+        unique = list(dict.fromkeys(normalize_ticker(t) for t in tickers if t.strip()))
+        for ticker in unique:
+            refresh_scheduler.touch(ticker, STOCK)
+        semaphore = asyncio.Semaphore(settings.PROVIDER_CONCURRENCY)
+
+        calls = {"yahoo": YahooService.get_quotes(unique)}
+        for ticker in unique:
+            calls[f"investidor10:{ticker}"] = bounded(semaphore, source_call(Investidor10Service.get_stock_data, ticker))
+            calls[f"status_invest:{ticker}"] = bounded(semaphore, source_call(StatusInvestService.get_stock_data, ticker))
+
+        results = await gather_with_deadline(calls, deadline or settings.QUOTE_DEADLINE_SECONDS)
+        yahoo_quotes = results["yahoo"] or {}
+
+        quotes = {}
+        missing = []
+        for ticker in unique:
+            sources = {
+                "yahoo": yahoo_quotes.get(ticker),
+                "investidor10": results[f"investidor10:{ticker}"],
+                "status_invest": results[f"status_invest:{ticker}"],
+            }
+            if not any(sources.values()):
+                missing.append(ticker)
+                continue
+            quote = consolidate_quote(
+                ticker, sources["yahoo"], sources["investidor10"], sources["status_invest"]
+            )
+            quote["partial"] = not all(sources.values())
+            quote["missing_sources"] = [name for name, data in sources.items() if data is None]
+            quotes[ticker] = quote
+
+        return {"quotes": quotes, "missing": missing}
+
+    @staticmethod
+    async def search(query: str, deadline: Optional[float] = None) -> list:
+        results = await gather_with_deadline(
+            {
+                "yahoo": source_call(YahooService.search_tickers, query),
+                "investidor10": source_call(Investidor10Service.search_stocks, query),
+                "status_invest": source_call(StatusInvestService.search_stocks, query),
+            },
+            deadline or settings.QUOTE_DEADLINE_SECONDS,
+        )
+
+        # Combine and deduplicate results
+        all_results = []
+        seen_tickers = set()
+
+        for name in ("yahoo", "investidor10", "status_invest"):
+            for result in results[name] or []:
+                ticker = (result.get("ticker") or "").upper()
+                if ticker and ticker not in seen_tickers:
+                    seen_tickers.add(ticker)
+                    all_results.append(result)
+
+        return all_results
+
+    @staticmethod
+    async def get_fii(ticker: str, deadline: Optional[float] = None) -> Dict:
+        ticker_clean = normalize_ticker(ticker)
+        refresh_scheduler.touch(ticker_clean, FII)
+        results = await gather_with_deadline(
+            {
+                "investidor10": source_call(Investidor10Service.get_fii_data, ticker_clean),
+                "status_invest": source_call(StatusInvestService.get_fii_data, ticker_clean),
+            },
+            deadline or settings.QUOTE_DEADLINE_SECONDS,
+        )
+
+        if not any(results.values()):
+            return {"error": "FII not found"}
+
+        return {
+            "ticker": ticker_clean,
+            "type": "FII",
+            "sources": results,
+            "partial": not all(results.values()),
+            "links": {
+                "google_finance": f"https://www.google.com/finance/quote/{ticker_clean}:BVMF",
+                "investidor10": f"https://www.investidor10.com.br/fiis/{ticker_clean}/",
+                "status_invest": f"https://www.statusinvest.com.br/fiis/{ticker_clean}"
+            }
+        }
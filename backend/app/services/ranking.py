@@ -0,0 +1,178 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.services.cache import quote_cache
+from app.services.screening import FundamentalsUniverse, ScoreWeights, get_universe
+from app.services.scoring_profiles import DEFAULT_PROFILE, PROFILES, ScoringProfile
+
+# Campos dos provedores que alimentam o score: P/L, ROE e DY
+PROVIDER_FIELDS = {"pe_ratio": "pl", "roe": "roe", "dividend_yield": "dy"}
+FUNDAMENTAL_NAMESPACES = (
+    "yahoo:quote",
+    "investidor10:stock",
+    "investidor10:fii",
+    "status_invest:stock",
+    "status_invest:fii",
+)
+# Linhas do topo de cada ranking mantidas prontas para leitura
+MATERIALIZED_ROWS = 100
+
+
+def provider_fundamentals(payload: Dict) -> Dict[str, float]:
+    """
+    Score inputs from a provider payload. Each scraper already reports ROE
+    and DY as fractions, like data.json.
+    """
+    values = {}
+    for field, column in PROVIDER_FIELDS.items():
+        try:
+            values[column] = float(payload[field])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return values
+
+
+class RankingIndex:
+    """
+    Ranking index over (ticker, score): keys are kept sorted by (-score,
+    ticker), so equal scores are ordered by ticker and a top-N read is a
+    slice from the front. Moving one ticker is a binary search plus a list
+    delete and insert, O(n) element shifts, which for a few thousand
+    tickers is a memmove far cheaper than rescoring the universe.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[float, str]] = []
+        self._scores: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rebuild(self, items: Iterable[Tuple[str, float]]) -> None:
+        scores = dict(items)
+        with self._lock:
+            self._scores = scores
+            self._keys = sorted((-score, ticker) for ticker, score in scores.items())
+
+    def update(self, ticker: str, score: float) -> bool:
+        with self._lock:
+            old = self._scores.get(ticker)
+            if old == score:
+                return False
+            if old is not None:
+                del self._keys[bisect_left(self._keys, (-old, ticker))]
+            insort(self._keys, (-score, ticker))
+            self._scores[ticker] = score
+            return True
+
+    def top(self, n: int, offset: int = 0) -> List[Tuple[str, float]]:
+        with self._lock:
+            return [(ticker, -neg) for neg, ticker in self._keys[offset:offset + n]]
+
+    def rank(self, ticker: str) -> Optional[int]:
+        with self._lock:
+            score = self._scores.get(ticker)
+            if score is None:
+                return None
+            return bisect_left(self._keys, (-score, ticker))
+
+
+class RankingService:
+    """
+    Keeps one ranking per scoring profile up to date one ticker at a time.
+    When a provider load changes a ticker's P/L, ROE or DY only that row is
+    rescored and moved in each profile's index; the full universe is scored
+    once, on first use. The first rows of every ranking are kept
+    materialized, so recommendations are a cache read.
+    """
+
+    def __init__(self, profiles: Dict[str, ScoringProfile]):
+        self.profiles = profiles
+        self.indexes = {name: RankingIndex() for name in profiles}
+        self._universe: Optional[FundamentalsUniverse] = None
+        self._top_rows: Dict[str, List[Dict]] = {}
+
+    @property
+    def universe(self) -> FundamentalsUniverse:
+        return self.build()
+
+    def build(self) -> FundamentalsUniverse:
+        if self._universe is None:
+            # Única passada completa: a partir daqui só linhas alteradas
+            universe = get_universe()
+            for name, profile in self.profiles.items():
+                scores = universe.score(profile.weights)
+                self.indexes[name].rebuild(zip(universe.tickers, scores.tolist()))
+            self._universe = universe
+        return self._universe
+
+    def profile_for(self, weights: ScoreWeights) -> Optional[str]:
+        for name, profile in self.profiles.items():
+            if profile.weights == weights:
+                return name
+        return None
+
+    async def apply(self, ticker: str, values: Dict[str, float]) -> List[str]:
+        """
+        Rescores one ticker after its fundamentals changed and returns the
+        profiles whose ranking moved.
+        """
+        universe = self.universe
+        row = universe.update(ticker, **values)
+        if row is None:
+            return []
+        # Os dados exibidos mudaram mesmo que o score não mude
+        self._top_rows.clear()
+        changed = []
+        for name, profile in self.profiles.items():
+            score = float(universe.score(profile.weights, rows=[row])[0])
+            if self.indexes[name].update(ticker, score):
+                changed.append(name)
+        return changed
+
+    def _rows(self, profile: str, n: int, offset: int) -> List[Dict]:
+        universe = self.universe
+        return [
+            {**universe.assets[universe.index[ticker]], "score": int(score), "rank": offset + i + 1}
+            for i, (ticker, score) in enumerate(self.indexes[profile].top(n, offset))
+        ]
+
+    def top(self, n: int, offset: int = 0, profile: str = DEFAULT_PROFILE) -> List[Dict]:
+        if offset or n > MATERIALIZED_ROWS:
+            return self._rows(profile, n, offset)
+        rows = self._top_rows.get(profile)
+        if rows is None:
+            rows = self._top_rows[profile] = self._rows(profile, MATERIALIZED_ROWS, 0)
+        return rows[:n]
+
+    def iter_rows(self, profile: str = DEFAULT_PROFILE, batch_size: int = 500) -> Iterator[Dict]:
+        """
+        The whole ranking, best first, built batch by batch for streaming.
+        """
+        for offset in range(0, self.size(), batch_size):
+            yield from self._rows(profile, batch_size, offset)
+
+    def rank(self, ticker: str, profile: str = DEFAULT_PROFILE) -> Optional[int]:
+        if ticker not in self.universe.index:
+            return None
+        position = self.indexes[profile].rank(ticker)
+        return None if position is None else position + 1
+
+    def size(self) -> int:
+        return len(self.universe)
+
+
+ranking_service = RankingService(PROFILES)
+
+
+async def on_provider_update(key: str, value) -> None:
+    if not isinstance(value, dict) or not value.get("ticker"):
+        return
+    values = provider_fundamentals(value)
+    if values:
+        await ranking_service.apply(str(value["ticker"]).upper().replace(".SA", ""), values)
+
+
+for _namespace in FUNDAMENTAL_NAMESPACES:
+    quote_cache.subscribe(_namespace, on_provider_update)
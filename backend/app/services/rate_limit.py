@@ -0,0 +1,125 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict
+from app.config import settings
+
+# Tokens que o aquecimento em segundo plano deixa para as requisições
+BACKGROUND_RESERVE = 1.0
+
+
+@dataclass
+class RateLimitStats:
+    acquired: int = 0
+    waited: int = 0
+    wait_seconds: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second up to `capacity`.
+    User-facing callers reserve a token right away (the balance may go
+    negative) and sleep until it is theirs, so they are served in arrival
+    order without holding a lock while waiting. Background callers only
+    take a token when `reserve` tokens would still be left, so queued user
+    requests always go first.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stats = RateLimitStats()
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def _waited(self, wait: float) -> None:
+        self.stats.waited += 1
+        self.stats.wait_seconds += wait
+
+    async def acquire(self) -> None:
+        # Sem await entre a leitura e a reserva: atômico no event loop
+        self._refill()
+        self.tokens -= 1
+        self.stats.acquired += 1
+        if self.tokens < 0:
+            wait = -self.tokens / self.rate
+            self._waited(wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Cancelada pelo prazo da requisição: devolve a reserva
+                self.tokens += 1
+                self.stats.acquired -= 1
+                raise
+
+    async def acquire_background(self, reserve: float) -> None:
+        while True:
+            self._refill()
+            missing = 1 + reserve - self.tokens
+            if missing <= 0:
+                self.tokens -= 1
+                self.stats.acquired += 1
+                return
+            wait = missing / self.rate
+            self._waited(wait)
+            await asyncio.sleep(wait)
+
+
+class ProviderRateLimits:
+    """
+    One bucket per upstream provider, shared by request handlers and the
+    background scheduler. Providers without a configured rate are not
+    limited.
+    """
+
+    def __init__(self, rates: Dict[str, float], burst: float):
+        self.buckets = {name: TokenBucket(rate, max(burst, 1.0)) for name, rate in rates.items() if rate > 0}
+
+    async def acquire(self, provider: str, background: bool = False) -> None:
+        bucket = self.buckets.get(provider)
+        if bucket is None:
+            return
+        if background:
+            await bucket.acquire_background(BACKGROUND_RESERVE)
+        else:
+            await bucket.acquire()
+
+    def has_capacity(self, provider: str, reserve: float = BACKGROUND_RESERVE) -> bool:
+        """
+        True when a call would not wait and would still leave `reserve`
+        tokens for user-facing requests.
+        """
+        bucket = self.buckets.get(provider)
+        return bucket is None or bucket.available() >= 1 + reserve
+
+    def as_dict(self) -> Dict:
+        return {
+            name: {**bucket.stats.as_dict(), "rate": bucket.rate, "tokens": round(bucket.available(), 2)}
+            for name, bucket in self.buckets.items()
+        }
+
+
+provider_limits = ProviderRateLimits(
+    {
+        "yahoo": settings.RATE_LIMIT_YAHOO_PER_SECOND,
+        "investidor10": settings.RATE_LIMIT_INVESTIDOR10_PER_SECOND,
+        "status_invest": settings.RATE_LIMIT_STATUS_INVEST_PER_SECOND,
+    },
+    burst=settings.RATE_LIMIT_BURST,
+)
@@ -0,0 +1,28 @@
+from typing import Optional
+import redis.asyncio as redis
+from app.config import settings
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Shared asyncio Redis client, created lazily on first use.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            decode_responses=True,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, time as dtime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from app.config import settings
+from app.services.circuit_breaker import breakers
+from app.services.investidor10_service import Investidor10Service
+from app.services.rate_limit import provider_limits
+from app.services.status_invest_service import StatusInvestService
+from app.services.yahoo_service import YahooService
+
+logger = logging.getLogger(__name__)
+
+B3_TZ = ZoneInfo("America/Sao_Paulo")
+# Pregão regular mais o after-market
+B3_OPEN = dtime(10, 0)
+B3_CLOSE = dtime(18, 0)
+
+STOCK = "stock"
+FII = "fii"
+
+# Fontes aquecidas por tipo de ativo (mesmas consultadas pelo QuoteAggregator)
+WARMERS = {
+    STOCK: (
+        YahooService.get_quote,
+        Investidor10Service.get_stock_data,
+        StatusInvestService.get_stock_data,
+    ),
+    FII: (
+        Investidor10Service.get_fii_data,
+        StatusInvestService.get_fii_data,
+    ),
+}
+
+
+def b3_open(now: Optional[datetime] = None) -> bool:
+    now = (now or datetime.now(B3_TZ)).astimezone(B3_TZ)
+    return now.weekday() < 5 and B3_OPEN <= now.time() < B3_CLOSE
+
+
+async def with_retries(
+    call: Callable[[], Awaitable],
+    attempts: int,
+    base_delay: float,
+    on_retry: Optional[Callable[[], None]] = None,
+):
+    """
+    Retries a provider call that raised or returned None, sleeping a random
+    delay up to base * 2^attempt between tries (full jitter).
+    """
+    for attempt in range(attempts):
+        try:
+            result = await call()
+        except Exception as exc:
+            logger.debug("Tentativa %d falhou: %s", attempt + 1, exc)
+            result = None
+        if result is not None or attempt == attempts - 1:
+            return result
+        if on_retry is not None:
+            on_retry()
+        await asyncio.sleep(random.uniform(0, base_delay * 2 ** attempt))
+    return None
+
+
+class HotSet:
+    """
+    Request frequency per ticker with exponential decay, so the hot set
+    follows what users look at now rather than all-time totals.
+    """
+
+    def __init__(self, half_life: float):
+        self.decay = math.log(2) / half_life
+        self._scores: Dict[str, Tuple[float, float, str]] = {}
+
+    def touch(self, ticker: str, kind: str = STOCK) -> None:
+        now = time.monotonic()
+        score, updated, _ = self._scores.get(ticker, (0.0, now, kind))
+        self._scores[ticker] = (score * math.exp(-self.decay * (now - updated)) + 1.0, now, kind)
+
+    def top(self, n: int) -> List[Tuple[str, str]]:
+        now = time.monotonic()
+        ranked = sorted(
+            self._scores.items(),
+            key=lambda item: item[1][0] * math.exp(-self.decay * (now - item[1][1])),
+            reverse=True,
+        )
+        # Descarta tickers frios para o dicionário não crescer sem limite
+        for ticker, _ in ranked[n * 4:]:
+            del self._scores[ticker]
+        return [(ticker, kind) for ticker, (_, _, kind) in ranked[:n]]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+@dataclass
+class SchedulerStats:
+    ticks: int = 0
+    refreshed: int = 0
+    deferred: int = 0
+    retries: int = 0
+    failures: int = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "ticks": self.ticks,
+            "refreshed": self.refreshed,
+            "deferred": self.deferred,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+class RefreshScheduler:
+    """
+    Keeps the hot set warm in the cache. Every tick the most requested
+    tickers are refreshed ahead of expiry, most requested first: prices in
+    one batched Yahoo download during B3 hours, fundamentals per provider
+    whenever their entries near expiry. Calls go through the same
+    per-provider token buckets as request handlers, and the scheduler
+    leaves a reserve of tokens for them, deferring the rest to the next
+    tick. Failed loads are retried with jittered exponential backoff.
+    """
+
+    def __init__(self):
+        self.hot = HotSet(settings.SCHEDULER_HALF_LIFE_SECONDS)
+        self.stats = SchedulerStats()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, ticker: str, kind: str = STOCK) -> None:
+        self.hot.touch(ticker, kind)
+
+    def interval(self) -> float:
+        if b3_open():
+            return settings.SCHEDULER_INTERVAL_SECONDS
+        return settings.SCHEDULER_OFF_HOURS_INTERVAL_SECONDS
+
+    def _retry(self) -> None:
+        self.stats.retries += 1
+
+    async def _warm(self, warmer, ticker: str) -> None:
+        result = await with_retries(
+            lambda: warmer.warm(ticker),
+            settings.SCHEDULER_MAX_RETRIES,
+            settings.SCHEDULER_BACKOFF_SECONDS,
+            on_retry=self._retry,
+        )
+        if result is None:
+            self.stats.failures += 1
+        else:
+            self.stats.refreshed += 1
+
+    async def tick(self) -> None:
+        self.stats.ticks += 1
+        hot = self.hot.top(settings.SCHEDULER_HOT_SET_SIZE)
+        if not hot:
+            return
+
+        if b3_open() and provider_limits.has_capacity("yahoo"):
+            await YahooService.get_quotes([ticker for ticker, kind in hot], background=True)
+
+        semaphore = asyncio.Semaphore(settings.PROVIDER_CONCURRENCY)
+
+        async def warm(warmer, ticker):
+            async with semaphore:
+                # Reserva tokens para as requisições dos usuários
+                if breakers.is_open(warmer.provider) or not provider_limits.has_capacity(warmer.provider):
+                    self.stats.deferred += 1
+                    return
+                await self._warm(warmer, ticker)
+
+        await asyncio.gather(*(warm(warmer, ticker) for ticker, kind in hot for warmer in WARMERS[kind]))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as exc:
+                logger.warning("Falha no aquecimento do cache: %s", exc)
+            await asyncio.sleep(self.interval())
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def as_dict(self) -> Dict:
+        return {
+            **self.stats.as_dict(),
+            "running": self._task is not None,
+            "hot_tickers": len(self.hot),
+            "market_open": b3_open(),
+        }
+
+
+refresh_scheduler = RefreshScheduler()
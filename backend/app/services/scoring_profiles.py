@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+from app.services.screening import ScoreWeights
+
+DEFAULT_PROFILE = "balanced"
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    name: str
+    label: str
+    weights: ScoreWeights
+
+
+# Perfis declarativos: cada um é só um conjunto de pesos da fórmula do analyzer
+PROFILES: Dict[str, ScoringProfile] = {
+    profile.name: profile
+    for profile in (
+        ScoringProfile("balanced", "Equilibrado", ScoreWeights()),
+        ScoringProfile(
+            "conservative", "Conservador",
+            ScoreWeights(pl=20.0, roe=60.0, dy=100.0, dy_stock=60.0, p_vpa=5.0, volatilidade=20.0),
+        ),
+        ScoringProfile(
+            "income", "Renda (dividendos)",
+            ScoreWeights(pl=10.0, roe=30.0, dy=100.0, dy_stock=150.0),
+        ),
+        ScoringProfile(
+            "growth", "Crescimento (valorização)",
+            ScoreWeights(pl=10.0, roe=100.0, dy=60.0),
+        ),
+    )
+}
+
+# Valores de User.objective e User.risk_profile usados no cadastro
+OBJECTIVE_PROFILES = {"dividendos": "income", "valorizacao": "growth", "misto": "balanced"}
+RISK_PROFILES = {"conservador": "conservative", "moderado": "balanced", "arrojado": "growth"}
+
+
+def resolve_profile(
+    profile: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    objective: Optional[str] = None,
+) -> ScoringProfile:
+    """
+    An explicit profile name wins; otherwise the user's objective, then
+    their risk profile, then the balanced (original analyzer) formula.
+    """
+    name = (
+        (profile or "").lower()
+        or OBJECTIVE_PROFILES.get((objective or "").lower())
+        or RISK_PROFILES.get((risk_profile or "").lower())
+        or DEFAULT_PROFILE
+    )
+    return PROFILES.get(name) or PROFILES[DEFAULT_PROFILE]
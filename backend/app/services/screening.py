@@ -0,0 +1,163 @@
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.local_data import load_local_assets
+
+FII_SECTOR = "Fundo Imobiliário"
+NUMERIC_FIELDS = ("pl", "roe", "dy", "p_vpa", "liquidez", "volatilidade")
+
+
+@dataclass
+class ScoreWeights:
+    """
+    Weights of the analyzer formula. The defaults reproduce
+    analyzer.calculate_score: (1/P/L) * 20 + ROE * 80 for stocks and
+    DY * 100 for FIIs; the remaining terms are off unless requested.
+    """
+    pl: float = 20.0
+    roe: float = 80.0
+    dy: float = 100.0
+    dy_stock: float = 0.0
+    p_vpa: float = 0.0
+    volatilidade: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass
+class ScreenFilters:
+    setor: Optional[str] = None
+    tipo: Optional[str] = None  # "acao" ou "fii"
+    min_dy: Optional[float] = None
+    max_pl: Optional[float] = None
+    min_roe: Optional[float] = None
+    max_p_vpa: Optional[float] = None
+    min_liquidez: Optional[float] = None
+    max_volatilidade: Optional[float] = None
+
+
+class FundamentalsUniverse:
+    """
+    Fundamentals of the whole universe held as one float64 array per field,
+    so a scoring profile is evaluated for every asset in a single pass.
+    """
+
+    def __init__(self, assets: List[Dict]):
+        self.assets = list(assets)
+        self.tickers = np.array([a["ticker"] for a in self.assets], dtype=object)
+        self.sectors = np.array([a.get("setor") or "" for a in self.assets], dtype=object)
+        self.columns = {
+            name: np.array(
+                [np.nan if a.get(name) is None else a[name] for a in self.assets], dtype=np.float64
+            )
+            for name in NUMERIC_FIELDS
+        }
+        self.is_fii = self.sectors == FII_SECTOR
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def from_local(cls) -> "FundamentalsUniverse":
+        return cls(load_local_assets())
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+    def score(self, weights: Optional[ScoreWeights] = None, rows=slice(None),
+              volatility: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Scores for all assets (or the given row selection). FIIs and stocks
+        follow different rules and are combined through the is_fii mask.
+        `volatility` replaces the stored column and may carry leading axes,
+        e.g. (dates, assets) to score every rebalance date of a backtest.
+        """
+        w = weights or ScoreWeights()
+        pl = self.columns["pl"][rows]
+        roe = np.nan_to_num(self.columns["roe"][rows])
+        dy = self.columns["dy"][rows]
+        p_vpa = self.columns["p_vpa"][rows]
+        vol = np.nan_to_num(self.columns["volatilidade"][rows] if volatility is None else volatility)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv_pl = np.where(pl > 0, 1.0 / pl, 0.0)
+            inv_p_vpa = np.where(p_vpa > 0, 1.0 / p_vpa, 0.0)
+        positive_dy = np.where(dy > 0, dy, 0.0)
+
+        stock = inv_pl * w.pl + roe * w.roe + positive_dy * w.dy_stock + inv_p_vpa * w.p_vpa - vol * w.volatilidade
+        fii = positive_dy * w.dy
+        return np.round(np.where(self.is_fii[rows], fii, stock))
+
+    def update(self, ticker: str, **values: Optional[float]) -> Optional[int]:
+        """
+        Writes new fundamentals for one asset in place. Returns its row when
+        any value changed, None for unknown tickers or unchanged values.
+        """
+        row = self.index.get(ticker)
+        if row is None:
+            return None
+        changed = False
+        for name, value in values.items():
+            if name not in self.columns or value is None:
+                continue
+            if self.columns[name][row] != value:
+                self.columns[name][row] = value
+                self.assets[row] = {**self.assets[row], name: value}
+                changed = True
+        return row if changed else None
+
+    def mask(self, filters: Optional[ScreenFilters] = None) -> np.ndarray:
+        f = filters or ScreenFilters()
+        c = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        if f.setor:
+            mask &= self.sectors == f.setor
+        if f.tipo == "fii":
+            mask &= self.is_fii
+        elif f.tipo == "acao":
+            mask &= ~self.is_fii
+        # Comparações com NaN são falsas: ativos sem o dado saem do filtro
+        if f.min_dy is not None:
+            mask &= c["dy"] >= f.min_dy
+        if f.max_pl is not None:
+            mask &= (c["pl"] > 0) & (c["pl"] <= f.max_pl)
+        if f.min_roe is not None:
+            mask &= c["roe"] >= f.min_roe
+        if f.max_p_vpa is not None:
+            mask &= c["p_vpa"] <= f.max_p_vpa
+        if f.min_liquidez is not None:
+            mask &= c["liquidez"] >= f.min_liquidez
+        if f.max_volatilidade is not None:
+            mask &= c["volatilidade"] <= f.max_volatilidade
+        return mask
+
+    def top_k(self, scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Indices of the k best scores, best first. argpartition selects the
+        top k in O(n); only those k are sorted. Ties keep universe order.
+        """
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+        if k <= 0 or candidates.size == 0:
+            return candidates[:0]
+        if k < candidates.size:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def rows(self, indices: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        return [{**self.assets[i], "score": int(scores[i])} for i in indices]
+
+    def screen(self, weights: Optional[ScoreWeights] = None,
+               filters: Optional[ScreenFilters] = None, limit: int = 20) -> Dict:
+        scores = self.score(weights)
+        mask = self.mask(filters)
+        top = self.top_k(scores, limit, mask)
+        return {"total": int(mask.sum()), "results": self.rows(top, scores)}
+
+
+_universe: Optional[FundamentalsUniverse] = None
+
+
+def get_universe() -> FundamentalsUniverse:
+    global _universe
+    if _universe is None:
+        _universe = FundamentalsUniverse.from_local()
+    return _universe
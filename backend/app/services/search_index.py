@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.repositories.symbol_repository import SymbolRepository
+from app.services.local_data import load_local_assets
+
+logger = logging.getLogger(__name__)
+
+# Pesos de cada tipo de acerto na ordenação
+EXACT_TICKER = 100
+TICKER_PREFIX = 80
+WORD_PREFIX = 50
+FUZZY_WORD = 30
+# Palavras curtas demais para tolerar erro de digitação
+FUZZY_MIN_LENGTH = 4
+# Intervalo entre tentativas enquanto a tabela symbols não pôde ser lida
+RELOAD_RETRY_SECONDS = 30.0
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Lowercase, accent-free text: "Fundo Imobiliário" -> "fundo imobiliario".
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def words(text: Optional[str]) -> List[str]:
+    return re.findall(r"[a-z0-9]+", fold(text))
+
+
+def deletes(word: str) -> Set[str]:
+    """
+    The word plus every variant with one character removed. Two words within
+    one edit (insert, delete, substitute) share at least one of these.
+    """
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+@dataclass
+class SearchEntry:
+    ticker: str
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    asset_type: Optional[str] = None
+
+    def as_dict(self) -> Dict:
+        return {"ticker": self.ticker, "name": self.name, "sector": self.sector, "type": self.asset_type}
+
+
+class Trie:
+    """
+    Prefix tree mapping every prefix of a key to the ids stored under it.
+    """
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def insert(self, key: str, item: int) -> None:
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault("", set()).add(item)
+
+    def remove(self, key: str, item: int) -> None:
+        node = self.root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return
+            node.get("", set()).discard(item)
+
+    def prefixed(self, prefix: str) -> Set[int]:
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get("", set())
+
+
+class SearchIndex:
+    """
+    In-memory autocomplete over the B3 universe: a trie of tickers, a trie
+    of the accent-folded words of company names and sectors, and a
+    one-delete map of those words for typo tolerance. Every lookup is a
+    handful of dict probes, so search-as-you-type never leaves the process.
+    """
+
+    def __init__(self):
+        self.entries: List[SearchEntry] = []
+        self.by_ticker: Dict[str, int] = {}
+        self.tickers = Trie()
+        self.words = Trie()
+        self.word_ids: Dict[str, Set[int]] = {}
+        self.typos: Dict[str, Set[str]] = {}
+        # Última carga completa (com a tabela symbols) e última tentativa
+        self.loaded_at = 0.0
+        self.attempted_at = 0.0
+        self._lock = threading.Lock()
+        self._reload: Optional[asyncio.Future] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, entry: SearchEntry) -> None:
+        with self._lock:
+            item = self.by_ticker.get(entry.ticker)
+            if item is not None:
+                current = self.entries[item]
+                entry = SearchEntry(
+                    entry.ticker,
+                    entry.name or current.name,
+                    entry.sector or current.sector,
+                    entry.asset_type or current.asset_type,
+                )
+                # Nome ou setor renomeado não pode continuar casando com as palavras antigas
+                self._unindex_words(item, current)
+                self.entries[item] = entry
+            else:
+                item = len(self.entries)
+                self.entries.append(entry)
+                self.by_ticker[entry.ticker] = item
+                self.tickers.insert(entry.ticker.lower(), item)
+            for word in words(entry.name) + words(entry.sector):
+                self.words.insert(word, item)
+                self.word_ids.setdefault(word, set()).add(item)
+                if len(word) >= FUZZY_MIN_LENGTH:
+                    for variant in deletes(word):
+                        self.typos.setdefault(variant, set()).add(word)
+
+    def _unindex_words(self, item: int, entry: SearchEntry) -> None:
+        for word in set(words(entry.name) + words(entry.sector)):
+            self.words.remove(word, item)
+            ids = self.word_ids.get(word)
+            if ids is None:
+                continue
+            ids.discard(item)
+            if ids:
+                continue
+            del self.word_ids[word]
+            if len(word) >= FUZZY_MIN_LENGTH:
+                for variant in deletes(word):
+                    variants = self.typos.get(variant)
+                    if variants is not None:
+                        variants.discard(word)
+                        if not variants:
+                            del self.typos[variant]
+
+    def _fuzzy(self, token: str) -> Set[int]:
+        if len(token) < FUZZY_MIN_LENGTH:
+            return set()
+        matches = set()
+        for variant in deletes(token):
+            for word in self.typos.get(variant, ()):
+                matches |= self.word_ids[word]
+        return matches
+
+    def _token_scores(self, token: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+        for item in self._fuzzy(token):
+            scores[item] = FUZZY_WORD
+        for item in self.words.prefixed(token):
+            scores[item] = WORD_PREFIX
+        for item in self.tickers.prefixed(token):
+            scores[item] = TICKER_PREFIX
+        exact = self.by_ticker.get(token.upper())
+        if exact is not None:
+            scores[exact] = EXACT_TICKER
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Entries matching every word of the query (ticker prefix, name or
+        sector word prefix, or a name word within one typo), best first.
+        """
+        tokens = words(query)
+        if not tokens:
+            return []
+        totals: Optional[Dict[int, int]] = None
+        for token in tokens:
+            scores = self._token_scores(token)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {item: totals[item] + score for item, score in scores.items() if item in totals}
+            if not totals:
+                return []
+        ranked = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], self.entries[item[0]].ticker))
+        return [self.entries[item].as_dict() for item, _ in ranked]
+
+    def build(self, entries: Iterable[SearchEntry], complete: bool = True) -> None:
+        fresh = SearchIndex()
+        for entry in entries:
+            fresh.add(entry)
+        with self._lock:
+            self.entries, self.by_ticker = fresh.entries, fresh.by_ticker
+            self.tickers, self.words = fresh.tickers, fresh.words
+            self.word_ids, self.typos = fresh.word_ids, fresh.typos
+            if complete:
+                self.loaded_at = time.monotonic()
+
+    def load(self, db: Optional[Session] = None) -> None:
+        """
+        Rebuilds the index from the symbols table, enriched with the sector
+        and company names of data.json (the only source when the database
+        is unavailable). A load without the database is served but does not
+        count as fresh, so it is retried after RELOAD_RETRY_SECONDS.
+        """
+        self.attempted_at = time.monotonic()
+        local = {
+            asset["ticker"]: SearchEntry(
+                asset["ticker"], asset.get("empresa"), asset.get("setor"),
+                "fii" if asset.get("setor") == "Fundo Imobiliário" else "acao",
+            )
+            for asset in load_local_assets()
+        }
+        entries = dict(local)
+        complete = db is not None
+        if db is not None:
+            try:
+                for row in SymbolRepository.iter_all(db, batch_size=1000):
+                    extra = local.get(row["ticker"])
+                    entries[row["ticker"]] = SearchEntry(
+                        row["ticker"],
+                        row["name"] or (extra.name if extra else None),
+                        extra.sector if extra else None,
+                        row["asset_type"],
+                    )
+            except (SQLAlchemyError, OSError) as exc:
+                db.rollback()
+                complete = False
+                logger.warning("Índice de busca carregado só do data.json: %s", exc)
+        self.build(entries.values(), complete=complete)
+
+    def is_stale(self, max_age: float) -> bool:
+        now = time.monotonic()
+        if self.loaded_at:
+            return now - self.loaded_at > max_age
+        return now - self.attempted_at > RELOAD_RETRY_SECONDS
+
+    async def ensure_fresh(self, reload: Callable[[], None], max_age: float) -> None:
+        """
+        Runs `reload` in a thread when the index is stale. Concurrent callers
+        share a single reload, and only wait for it while the index is still
+        empty; otherwise they keep searching the current entries.
+        """
+        if self._reload is None or self._reload.done():
+            if not self.is_stale(max_age):
+                return
+            self.attempted_at = time.monotonic()
+            self._reload = asyncio.ensure_future(asyncio.to_thread(reload))
+            self._reload.add_done_callback(log_reload_failure)
+        if not self.entries:
+            # wait: não cancela a recarga nem propaga sua falha (já registrada)
+            await asyncio.wait({self._reload})
+
+
+def log_reload_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Falha ao recarregar o índice de busca: %s", future.exception())
+
+
+search_index = SearchIndex()
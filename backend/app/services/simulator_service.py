@@ -0,0 +1,227 @@
+import json
+import math
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+MONTHS_5Y = 60
+PERCENTILES = (0.10, 0.50, 0.90)
+
+
+def deterministic_years(g, y, target_ratio, reinvest):
+    """
+    Closed-form time to target in years: ln(1 + L/I0) / ln(1 + g [+ y]).
+    Accepts scalars or broadcastable arrays; invalid combinations give NaN.
+    """
+    g = np.asarray(g, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    target_ratio = np.asarray(target_ratio, dtype=np.float64)
+    growth = np.where(np.asarray(reinvest, dtype=bool), g + y, g)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        numer = np.log1p(target_ratio)
+        denom = np.log1p(growth)
+        years = numer / denom
+    return np.where((numer > 0) & (denom > 0), years, np.nan)
+
+
+def grid_axis(text: str, max_points: int) -> Tuple[float, ...]:
+    """
+    Values of one grid axis: comma-separated numbers and/or inclusive
+    ranges "start:stop:step", e.g. "0.02:0.12:0.01,0.15". Sorted, without
+    duplicates. Raises ValueError when malformed or too long.
+    """
+    values = []
+    for item in text.split(","):
+        try:
+            parts = [float(part) for part in item.split(":")]
+        except ValueError:
+            raise ValueError(f"valor inválido '{item}'") from None
+        # inf/nan quebrariam a contagem de pontos e o JSON da resposta
+        if not all(math.isfinite(part) for part in parts):
+            raise ValueError(f"valor inválido '{item}'")
+        if len(parts) == 1:
+            values.append(parts[0])
+        elif len(parts) == 3 and parts[2] > 0 and parts[1] >= parts[0]:
+            count = int(math.floor((parts[1] - parts[0]) / parts[2] + 1e-9)) + 1
+            if count > max_points:
+                raise ValueError(f"mais de {max_points} pontos em '{item}'")
+            values.extend(parts[0] + parts[2] * np.arange(count))
+        else:
+            raise ValueError(f"intervalo inválido '{item}'")
+    # Arredonda o ruído de ponto flutuante dos intervalos (0.1 + 0.2...)
+    axis = tuple(np.unique(np.round(values, 10)).tolist())
+    if len(axis) > max_points:
+        raise ValueError(f"mais de {max_points} pontos")
+    return axis
+
+
+def sensitivity_grid(g: Tuple[float, ...], y: Tuple[float, ...], target_ratio: Tuple[float, ...],
+                     reinvest: Tuple[bool, ...]) -> Dict:
+    """
+    deterministic_years over the full grid in one broadcast: a
+    (reinvest, target_ratio, y, g) array of years, NaN cells as None.
+    """
+    years = deterministic_years(
+        np.array(g)[None, None, None, :],
+        np.array(y)[None, None, :, None],
+        np.array(target_ratio)[None, :, None, None],
+        np.array(reinvest)[:, None, None, None],
+    )
+    values = np.round(years, 3).astype(object)
+    values[np.isnan(years)] = None
+    return {
+        "dims": ["reinvest", "target_ratio", "y", "g"],
+        "axes": {"reinvest": list(reinvest), "target_ratio": list(target_ratio), "y": list(y), "g": list(g)},
+        "unit": "years",
+        "values": values.tolist(),
+    }
+
+
+@lru_cache(maxsize=16)
+def sensitivity_grid_json(g: Tuple[float, ...], y: Tuple[float, ...], target_ratio: Tuple[float, ...],
+                          reinvest: Tuple[bool, ...]) -> bytes:
+    """
+    Serialized sensitivity_grid. Only a few recent grids are kept (as
+    bytes, not nested lists); repeat clients are served by the ETag.
+    """
+    return json.dumps(sensitivity_grid(g, y, target_ratio, reinvest), separators=(",", ":")).encode()
+
+
+def monthly_log_drift(mu: float, sigma: float, dividend_yield: float, reinvest: bool) -> float:
+    dt = 1 / 12
+    drift = (mu - 0.5 * sigma * sigma) * dt
+    if reinvest and dividend_yield > 0:
+        drift += math.log1p(dividend_yield * dt)
+    return drift
+
+
+def standard_normals(rng: np.random.Generator, n_paths: int, n_steps: int, antithetic: bool,
+                     n_assets: Optional[int] = None) -> np.ndarray:
+    shape = (n_steps,) if n_assets is None else (n_steps, n_assets)
+    if not antithetic:
+        return rng.standard_normal((n_paths, *shape), dtype=np.float32)
+    half = rng.standard_normal(((n_paths + 1) // 2, *shape), dtype=np.float32)
+    return np.concatenate([half, -half])[:n_paths]
+
+
+def first_hit_months(log_paths: np.ndarray, log_target: float) -> np.ndarray:
+    """
+    First month (1-based) in which each path reaches the target, or inf when
+    it never does. Uses the running maximum so the last column tells whether
+    the path ever crossed and argmax gives the first crossing.
+    """
+    crossed = np.maximum.accumulate(log_paths, axis=-1) >= log_target
+    first = crossed.argmax(axis=-1) + 1
+    return np.where(crossed[..., -1], first, np.inf)
+
+
+def summarize_hit_months(hit_months: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    p10/p50/p90 of the time to target plus the probability of missing it in
+    five years. Percentiles that fall on paths that never hit are None.
+    """
+    quantiles = np.quantile(hit_months, PERCENTILES, method="inverted_cdf")
+    p10, p50, p90 = (float(q) if np.isfinite(q) else None for q in quantiles)
+    return {
+        "p10_months": p10,
+        "p50_months": p50,
+        "p90_months": p90,
+        "prob_not_hit_in_5y": float(np.mean(hit_months > MONTHS_5Y)),
+    }
+
+
+def simulate_time_to_target(
+    initial_investment: float,
+    profit_target: float,
+    mu: float,
+    sigma: float,
+    dividend_yield: float = 0.0,
+    reinvest: bool = True,
+    n_paths: int = 10_000,
+    horizon_years: int = 5,
+    seed: Optional[int] = None,
+    antithetic: bool = True,
+) -> Dict[str, Optional[float]]:
+    """
+    Monte Carlo (GBM, monthly steps) of the months needed for I0 to grow by L.
+    All paths x steps of a chunk are generated as one matrix; chunks keep the
+    memory bounded for large path counts.
+    """
+    n_steps = max(horizon_years * 12, MONTHS_5Y)
+    drift = np.float32(monthly_log_drift(mu, sigma, dividend_yield, reinvest))
+    vol = np.float32(sigma * math.sqrt(1 / 12))
+    log_target = math.log1p(profit_target / initial_investment)
+
+    rng = np.random.default_rng(seed)
+    hit_months = np.empty(n_paths, dtype=np.float64)
+    chunk = settings.SIMULATOR_CHUNK_PATHS
+    for start in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - start)
+        shocks = standard_normals(rng, size, n_steps, antithetic)
+        shocks *= vol
+        shocks += drift
+        log_paths = np.cumsum(shocks, axis=1, out=shocks)
+        hit_months[start:start + size] = first_hit_months(log_paths, log_target)
+
+    return summarize_hit_months(hit_months)
+
+
+def correlated_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    Lower Cholesky factor of a covariance matrix. Sample covariances with
+    fewer observations than assets are singular, so a tiny ridge is added
+    until the factorization succeeds.
+    """
+    ridge = 0.0
+    scale = float(np.mean(np.diag(cov))) or 1.0
+    for _ in range(6):
+        try:
+            return np.linalg.cholesky(cov + ridge * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            ridge = ridge * 10 if ridge else scale * 1e-10
+    raise ValueError("covariance matrix is not positive semi-definite")
+
+
+def simulate_portfolio_time_to_target(
+    amounts: np.ndarray,
+    profit_target: float,
+    mu: np.ndarray,
+    cov: np.ndarray,
+    dividend_yield: np.ndarray,
+    reinvest: bool = True,
+    n_paths: int = 10_000,
+    horizon_years: int = 5,
+    seed: Optional[int] = None,
+    antithetic: bool = True,
+) -> Dict[str, Optional[float]]:
+    """
+    Monte Carlo of a buy-and-hold portfolio: correlated GBM for every asset
+    (shocks = standard normals x Cholesky factor of the monthly covariance),
+    generated as one (paths, steps, assets) tensor per chunk. Chunks hold
+    SIMULATOR_CHUNK_PATHS / assets paths, so memory matches the single-asset
+    simulation whatever the portfolio size.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    n_assets = len(amounts)
+    n_steps = max(horizon_years * 12, MONTHS_5Y)
+    dt = 1 / 12
+    drift = (np.asarray(mu) - 0.5 * np.diag(cov)) * dt
+    if reinvest:
+        drift = drift + np.log1p(np.maximum(np.asarray(dividend_yield), 0.0) * dt)
+    drift = drift.astype(np.float32)
+    factor_t = correlated_factor(np.asarray(cov) * dt).T.astype(np.float32)
+    weights = (amounts / amounts.sum()).astype(np.float32)
+    log_target = math.log1p(profit_target / amounts.sum())
+
+    rng = np.random.default_rng(seed)
+    hit_months = np.empty(n_paths, dtype=np.float64)
+    chunk = max(1, settings.SIMULATOR_CHUNK_PATHS // n_assets)
+    for start in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - start)
+        shocks = standard_normals(rng, size, n_steps, antithetic, n_assets) @ factor_t
+        shocks += drift
+        growth = np.exp(np.cumsum(shocks, axis=1, out=shocks), out=shocks)
+        hit_months[start:start + size] = first_hit_months(np.log(growth @ weights), log_target)
+
+    return summarize_hit_months(hit_months)
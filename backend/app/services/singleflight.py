@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from redis.exceptions import LockError, RedisError
+from app.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre consultas ao cache enquanto outro worker busca a mesma chave
+POLL_INTERVAL_SECONDS = 0.05
+
+
+@dataclass
+class SingleFlightStats:
+    leaders: int = 0
+    shared: int = 0
+    remote_waits: int = 0
+
+    def as_dict(self) -> Dict:
+        return {"leaders": self.leaders, "shared": self.shared, "remote_waits": self.remote_waits}
+
+
+class SingleFlight:
+    """
+    In-flight request registry: concurrent callers for the same key await a
+    single shared upstream fetch. With SINGLEFLIGHT_REDIS_LOCK enabled the
+    fetch is also coordinated across uvicorn workers through a Redis lock;
+    workers that lose the race wait for the winner's result to land in the
+    cache instead of calling the provider themselves, until the winner
+    releases the lock or the quote deadline passes.
+    """
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        check: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.leaders += 1
+            task = self._register(key, asyncio.ensure_future(self._run(key, fn, check)))
+        else:
+            self.stats.shared += 1
+        # shield: um chamador cancelado (ex.: deadline) não cancela a busca dos demais
+        return await asyncio.shield(task)
+
+    async def do_many(
+        self,
+        keys: List[str],
+        fn: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Per-key coalescing for batch loaders: keys already in flight are
+        awaited, the remaining ones are fetched with a single fn(keys) call
+        whose result is shared key by key. Overlapping batches therefore
+        only fetch the keys nobody is fetching yet.
+        """
+        tasks = {key: self._inflight.get(key) for key in keys}
+        own = [key for key, task in tasks.items() if task is None]
+        self.stats.shared += len(keys) - len(own)
+        if own:
+            self.stats.leaders += 1
+            batch = asyncio.ensure_future(fn(own))
+            for key in own:
+                tasks[key] = self._register(key, asyncio.ensure_future(self._pick(batch, key)))
+        values = await asyncio.gather(*(asyncio.shield(task) for task in tasks.values()), return_exceptions=True)
+        return {
+            key: value for key, value in zip(tasks, values)
+            if value is not None and not isinstance(value, BaseException)
+        }
+
+    def _register(self, key: str, task: asyncio.Task) -> asyncio.Task:
+        def done(_):
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+        self._inflight[key] = task
+        task.add_done_callback(done)
+        return task
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future, key: str) -> Any:
+        return (await batch).get(key)
+
+    async def _run(self, key: str, fn, check) -> Any:
+        if not settings.SINGLEFLIGHT_REDIS_LOCK or check is None:
+            return await fn()
+
+        timeout = settings.SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS
+        try:
+            lock = get_redis().lock(f"lock:{key}", timeout=timeout)
+            acquired = await lock.acquire(blocking=False)
+        except (RedisError, OSError) as exc:
+            logger.warning("Lock distribuído indisponível para %s: %s", key, exc)
+            return await fn()
+
+        if acquired:
+            try:
+                return await fn()
+            finally:
+                try:
+                    await lock.release()
+                except (LockError, RedisError, OSError):
+                    pass
+
+        # Outro worker está buscando: aguarda o resultado aparecer no cache.
+        # O lock liberado marca o fim da busca, mesmo sem resultado (None
+        # não é cacheado), e a espera nunca passa do prazo das requisições.
+        self.stats.remote_waits += 1
+        deadline = time.monotonic() + min(timeout, settings.QUOTE_DEADLINE_SECONDS)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            value = await check()
+            if value is not None:
+                return value
+            try:
+                if not await lock.locked():
+                    return await check()
+            except (RedisError, OSError):
+                return await fn()
+        return None
+
+
+singleflight = SingleFlight()
@@ -1,29 +1,31 @@
-import requests
+import logging
 from typing import Optional, Dict
+from app.services.cache import cached, FUNDAMENTALS, SEARCH
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.http_client import PROVIDER_ERRORS, http_pool
+from app.utils.numbers import percent_to_fraction
+
+logger = logging.getLogger(__name__)
 
 class StatusInvestService:
     BASE_URL = "https://www.statusinvest.com.br"
     API_URL = "https://api.statusinvest.com.br"
-    
+
     @staticmethod
-    def get_stock_data(ticker: str) -> Optional[Dict]:
+    @cached("status_invest:stock", FUNDAMENTALS)
+    async def get_stock_data(ticker: str) -> Optional[Dict]:
         """
         Fetch stock data from Status Invest
         """
         try:
             # Remove .SA if present for Status Invest API
             clean_ticker = ticker.replace(".SA", "")
-            
+
             # Try Status Invest API
             url = f"{StatusInvestService.API_URL}/quote/{clean_ticker}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, provider="status_invest")
+
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -32,44 +34,37 @@ class StatusInvestService:
                     "price": data.get("price") or data.get("lastPrice"),
                     "pe_ratio": data.get("pe"),
                     "pb_ratio": data.get("pb"),
-                    "dividend_yield": data.get("dy"),
-                    "roa": data.get("roa"),
-                    "roe": data.get("roe"),
-                    "net_margin": data.get("netMargin"),
-                    "roic": data.get("roic"),
+                    "dividend_yield": percent_to_fraction(data.get("dy")),
+                    "roa": percent_to_fraction(data.get("roa")),
+                    "roe": percent_to_fraction(data.get("roe")),
+                    "net_margin": percent_to_fraction(data.get("netMargin")),
+                    "roic": percent_to_fraction(data.get("roic")),
                     "ev_ebitda": data.get("evEbitda"),
                     "sector": data.get("sector"),
                     "subsector": data.get("subsector"),
                 }
-            
-            # Fallback: return data with link
-            return {
-                "source": "status_invest",
-                "ticker": clean_ticker,
-                "link": f"{StatusInvestService.BASE_URL}/acoes/{clean_ticker}",
-                "note": "Detailed data available on Status Invest"
-            }
-            
-        except Exception as e:
-            print(f"Error fetching Status Invest data for {ticker}: {e}")
+
+            # Respostas de erro (429, 5xx) não são cacheadas
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error fetching Status Invest data for %s: %s", ticker, e)
             return None
 
     @staticmethod
-    def search_stocks(query: str) -> list:
+    @cached("status_invest:search", SEARCH)
+    async def search_stocks(query: str) -> Optional[list]:
         """
         Search stocks on Status Invest
         """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
             url = f"{StatusInvestService.API_URL}/search"
             params = {"q": query, "type": "stock"}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, params=params, provider="status_invest")
+
             if response.status_code == 200:
                 results = response.json()
                 return [
@@ -81,29 +76,27 @@ class StatusInvestService:
                     }
                     for r in results[:10]
                 ]
-            return []
-            
-        except Exception as e:
-            print(f"Error searching Status Invest for {query}: {e}")
-            return []
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error searching Status Invest for %s: %s", query, e)
+            return None
 
     @staticmethod
-    def get_fii_data(fii_ticker: str) -> Optional[Dict]:
+    @cached("status_invest:fii", FUNDAMENTALS)
+    async def get_fii_data(fii_ticker: str) -> Optional[Dict]:
         """
         Fetch FII (Fundo de Investimento Imobiliário) data from Status Invest
         """
         try:
             clean_ticker = fii_ticker.replace(".SA", "")
-            
+
             url = f"{StatusInvestService.API_URL}/fii/{clean_ticker}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, provider="status_invest")
+
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -111,45 +104,40 @@ class StatusInvestService:
                     "ticker": clean_ticker,
                     "type": "FII",
                     "price": data.get("price") or data.get("lastPrice"),
-                    "dividend_yield": data.get("dy"),
+                    "dividend_yield": percent_to_fraction(data.get("dy")),
                     "pvp_ratio": data.get("pvp"),
                     "distribution": data.get("distribution"),
                     "sector": data.get("sector"),
                     "link": f"{StatusInvestService.BASE_URL}/fiis/{clean_ticker}/"
                 }
-            
-            return {
-                "source": "status_invest",
-                "ticker": clean_ticker,
-                "type": "FII",
-                "link": f"{StatusInvestService.BASE_URL}/fiis/{clean_ticker}/"
-            }
-            
-        except Exception as e:
-            print(f"Error fetching FII data from Status Invest for {fii_ticker}: {e}")
+
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error fetching FII data from Status Invest for %s: %s", fii_ticker, e)
             return None
 
     @staticmethod
-    def get_analyst_recommendations(ticker: str) -> list:
+    @cached("status_invest:recommendations", FUNDAMENTALS)
+    async def get_analyst_recommendations(ticker: str) -> Optional[list]:
         """
         Fetch analyst recommendations from Status Invest
         """
         try:
             clean_ticker = ticker.replace(".SA", "")
-            
+
             url = f"{StatusInvestService.API_URL}/quote/{clean_ticker}/recommendations"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+
+            response = await http_pool.get(url, provider="status_invest")
+
             if response.status_code == 200:
                 return response.json()
-            return []
-            
-        except Exception as e:
-            print(f"Error fetching analyst recommendations from Status Invest for {ticker}: {e}")
-            return []
+            return None
+
+        except CircuitOpenError:
+            return None
+        except PROVIDER_ERRORS as e:
+            logger.warning("Error fetching analyst recommendations from Status Invest for %s: %s", ticker, e)
+            return None
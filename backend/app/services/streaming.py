@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Optional, Union
+from fastapi.responses import StreamingResponse
+
+NDJSON = "ndjson"
+SSE = "sse"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", SSE: "text/event-stream"}
+
+
+def encode_cursor(values: Dict) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """
+    Opaque keyset cursor back to its values. Raises ValueError if malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(values, dict):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def dumps(row: Dict) -> str:
+    return json.dumps(row, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def ndjson_lines(rows: Iterable[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield dumps(row) + "\n"
+
+
+def sse_events(rows: Iterable[Dict]) -> Iterator[str]:
+    count = 0
+    for row in rows:
+        count += 1
+        yield f"data: {dumps(row)}\n\n"
+    yield f"event: end\ndata: {dumps({'count': count})}\n\n"
+
+
+async def ndjson_lines_async(rows: AsyncIterable[Dict]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield dumps(row) + "\n"
+
+
+async def sse_events_async(rows: AsyncIterable[Dict]) -> AsyncIterator[str]:
+    count = 0
+    async for row in rows:
+        count += 1
+        yield f"data: {dumps(row)}\n\n"
+    yield f"event: end\ndata: {dumps({'count': count})}\n\n"
+
+
+def stream_rows(rows: Union[Iterable[Dict], AsyncIterable[Dict]], fmt: str = NDJSON) -> StreamingResponse:
+    """
+    Streams rows as they are produced (one JSON object per line, or one SSE
+    event per row), so memory stays flat however long the result is.
+    Async iterables (AsyncSession reads) are consumed on the event loop;
+    plain iterables are iterated in the threadpool by Starlette.
+    """
+    if hasattr(rows, "__aiter__"):
+        body = sse_events_async(rows) if fmt == SSE else ndjson_lines_async(rows)
+    else:
+        body = sse_events(rows) if fmt == SSE else ndjson_lines(rows)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -1,55 +1,203 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 import yfinance as yf
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from app.config import settings
+from app.services.cache import cached, cache_key, quote_cache, PRICE, SEARCH
+from app.services.circuit_breaker import CircuitOpenError, breakers
+from app.services.rate_limit import provider_limits
+from app.services.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+
+# yfinance é bloqueante e não pode ser interrompido: uma chamada que estoura
+# o timeout do breaker segue rodando na thread. O pool próprio limita quantas
+# dessas threads existem, em vez de acumulá-las no executor padrão do asyncio.
+yahoo_executor = ThreadPoolExecutor(max_workers=settings.YAHOO_THREAD_WORKERS, thread_name_prefix="yahoo")
+
+
+async def run_guarded(fn, *args):
+    # Roda no pool do Yahoo, sob o circuit breaker; o contexto leva o request id
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await breakers["yahoo"].call(
+        lambda: loop.run_in_executor(yahoo_executor, functools.partial(context.run, fn, *args))
+    )
+
 
 class YahooService:
     @staticmethod
-    def get_quote(ticker: str) -> Optional[Dict]:
+    @cached("yahoo:quote", PRICE)
+    async def get_quote(ticker: str) -> Optional[Dict]:
         try:
-            # Add .SA suffix for B3 tickers if not already present
-            if not ticker.endswith(".SA"):
-                ticker = f"{ticker}.SA"
-            
-            data = yf.Ticker(ticker)
-            info = data.info
-            
-            # Obter preço atual
-            current_price = info.get("currentPrice") or info.get("regularMarketPrice")
-            
-            # Calcular variação percentual
-            change_percent = info.get("regularMarketChangePercent")
-            if change_percent is None and info.get("regularMarketChange") and current_price:
-                # Calcular manualmente se não estiver disponível
-                prev_close = info.get("previousClose")
-                if prev_close and prev_close > 0:
-                    change_percent = ((current_price - prev_close) / prev_close) * 100
-            
-            return {
-                "ticker": ticker.replace('.SA', ''),
-                "price": current_price,
-                "name": info.get("longName"),
-                "currency": info.get("currency"),
-                "market_cap": info.get("marketCap"),
-                "dividend_yield": info.get("dividendYield"),
+            return await run_guarded(YahooService._fetch_quote, ticker)
+        except CircuitOpenError:
+            return None
+        except Exception as e:
+            logger.warning("Error fetching quote for %s: %s", ticker, e)
+            return None
+
+    @staticmethod
+    def _fetch_quote(ticker: str) -> Optional[Dict]:
+        # Add .SA suffix for B3 tickers if not already present
+        if not ticker.endswith(".SA"):
+            ticker = f"{ticker}.SA"
+
+        data = yf.Ticker(ticker)
+        info = data.info
+
+        # Obter preço atual
+        current_price = info.get("currentPrice") or info.get("regularMarketPrice")
+
+        # Calcular variação percentual
+        change_percent = info.get("regularMarketChangePercent")
+        if change_percent is None and info.get("regularMarketChange") and current_price:
+            # Calcular manualmente se não estiver disponível
+            prev_close = info.get("previousClose")
+            if prev_close and prev_close > 0:
+                change_percent = ((current_price - prev_close) / prev_close) * 100
+
+        return {
+            "ticker": ticker.replace('.SA', ''),
+            "price": current_price,
+            "name": info.get("longName"),
+            "currency": info.get("currency"),
+            "market_cap": info.get("marketCap"),
+            "dividend_yield": info.get("dividendYield"),
+            "change_percent": change_percent,
+            "previous_close": info.get("previousClose"),
+        }
+
+    @staticmethod
+    async def get_quotes(tickers: List[str], fresh: bool = False, background: bool = False) -> Dict[str, Dict]:
+        """
+        Fetch last prices for many tickers with a single yf.download call.
+        Cached tickers are skipped; stale ones are refreshed together in the
+        background. With `fresh` (the live price feed) every ticker is
+        downloaded now and the cache is only written. `background` (the
+        refresh scheduler) takes rate-limit tokens behind user requests and
+        stays out of the cache hit/miss stats.
+        """
+        keys = {cache_key("yahoo:price", t): t for t in tickers}
+        if fresh:
+            values, stale, missing = {}, [], list(keys)
+        else:
+            values, stale, missing = await quote_cache.lookup_many(list(keys), track=not background)
+        quotes = {keys[key]: value for key, value in values.items()}
+
+        async def load(batch: List[str]) -> Dict[str, Dict]:
+            await provider_limits.acquire("yahoo", background=background)
+            try:
+                fetched = await run_guarded(YahooService._fetch_quotes, batch)
+            except CircuitOpenError:
+                return {}
+            except Exception as e:
+                logger.warning("Error fetching batch quotes for %s: %s", batch, e)
+                return {}
+            for ticker, quote in fetched.items():
+                await quote_cache.set(cache_key("yahoo:price", ticker), quote, PRICE)
+            return fetched
+
+        async def load_keys(batch: List[str]) -> Dict[str, Dict]:
+            fetched = await load([keys[key] for key in batch])
+            return {cache_key("yahoo:price", ticker): quote for ticker, quote in fetched.items()}
+
+        if stale:
+            stale_tickers = sorted(keys[key] for key in stale)
+            quote_cache.schedule_refresh(
+                cache_key("yahoo:price", *stale_tickers), lambda: load(stale_tickers)
+            )
+        # Com o circuito aberto servimos só o que está em cache
+        if missing and not breakers.is_open("yahoo"):
+            # Coalescência por ticker: lotes que se sobrepõem só baixam o que falta
+            fetched = await singleflight.do_many(missing, load_keys)
+            quotes.update({keys[key]: quote for key, quote in fetched.items()})
+        return quotes
+
+    @staticmethod
+    def _fetch_quotes(tickers: List[str]) -> Dict[str, Dict]:
+        if not tickers:
+            return {}
+        symbols = [t if t.endswith(".SA") else f"{t}.SA" for t in tickers]
+        frame = yf.download(
+            tickers=" ".join(symbols),
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+
+        quotes = {}
+        for symbol in symbols:
+            try:
+                # Com um único ticker o yfinance não agrupa as colunas por ticker
+                closes = frame[symbol]["Close"] if len(symbols) > 1 else frame["Close"]
+                closes = closes.dropna()
+            except KeyError:
+                continue
+            if closes.empty:
+                continue
+
+            price = float(closes.iloc[-1])
+            prev_close = float(closes.iloc[-2]) if len(closes) > 1 else None
+            change_percent = None
+            if prev_close and prev_close > 0:
+                change_percent = ((price - prev_close) / prev_close) * 100
+
+            ticker = symbol.replace('.SA', '')
+            quotes[ticker] = {
+                "ticker": ticker,
+                "price": price,
+                "currency": "BRL",
                 "change_percent": change_percent,
-                "previous_close": info.get("previousClose"),
+                "previous_close": prev_close,
             }
+        return quotes
+
+    @staticmethod
+    def get_trailing_dividends(ticker: str, days: int = 365) -> Optional[float]:
+        """
+        Sum of dividends paid per share over the trailing window (blocking).
+        """
+        try:
+            if not ticker.endswith(".SA"):
+                ticker = f"{ticker}.SA"
+            dividends = yf.Ticker(ticker).dividends
+            if dividends.empty:
+                return 0.0
+            cutoff = pd.Timestamp.now(tz=dividends.index.tz) - pd.Timedelta(days=days)
+            return float(dividends[dividends.index > cutoff].sum())
         except Exception as e:
-            print(f"Error fetching quote for {ticker}: {e}")
+            logger.warning("Error fetching dividends for %s: %s", ticker, e)
             return None
 
     @staticmethod
-    def search_tickers(query: str) -> list:
+    @cached("yahoo:search", SEARCH)
+    async def search_tickers(query: str) -> Optional[list]:
         try:
-            # Search using yfinance
-            # This is a simplified approach - consider using a more robust search API
-            results = yf.Ticker(query)
-            if results.info.get("longName"):
-                return [{
-                    "ticker": query,
-                    "name": results.info.get("longName"),
-                    "type": results.info.get("quoteType")
-                }]
-            return []
+            return await run_guarded(YahooService._search_tickers, query)
+        except CircuitOpenError:
+            return None
         except Exception as e:
-            print(f"Error searching for {query}: {e}")
-            return []
+            logger.warning("Error searching for %s: %s", query, e)
+            return None
+
+    @staticmethod
+    def _search_tickers(query: str) -> list:
+        # Search using yfinance
+        # This is a simplified approach - consider using a more robust search API
+        results = yf.Ticker(query)
+        if results.info.get("longName"):
+            return [{
+                "ticker": query,
+                "name": results.info.get("longName"),
+                "type": results.info.get("quoteType")
+            }]
+        return []
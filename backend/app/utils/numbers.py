@@ -0,0 +1,12 @@
+from typing import Any, Optional
+
+
+def percent_to_fraction(value: Any) -> Optional[float]:
+    """
+    Converts a provider percentage (12.5 = 12,5%) to the fraction used by
+    data.json and Yahoo (0.125). Missing or non-numeric values give None.
+    """
+    try:
+        return float(value) / 100
+    except (TypeError, ValueError):
+        return None
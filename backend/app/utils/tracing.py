@@ -0,0 +1,41 @@
+import logging
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+# Propagado a tasks e threads via contextvars (asyncio.create_task, to_thread)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """
+    Reuses the caller's X-Request-ID when it is well formed, so a trace
+    can start at a proxy or the frontend; otherwise generates one.
+    """
+    if incoming and VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def trace_headers() -> Dict[str, str]:
+    request_id = current_request_id()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds `request_id` to every log record so log lines can be joined with
+    the request (and upstream calls) that produced them.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id() or "-"
+        return True
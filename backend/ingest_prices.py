@@ -0,0 +1,37 @@
+import argparse
+import logging
+import time
+
+from app.services.price_ingestion import run_ingestion_job
+
+
+def main():
+    """
+    Ingests daily prices into the prices table.
+    Run from the backend directory: python ingest_prices.py [--tickers PETR4 VALE3]
+    """
+    parser = argparse.ArgumentParser(description="Ingestão de preços históricos da B3")
+    parser.add_argument("--tickers", nargs="*", help="Tickers a ingerir (padrão: todos da tabela symbols)")
+    parser.add_argument("--tickers-file", help="Arquivo com um ticker por linha")
+    parser.add_argument("--years", type=int, default=5, help="Anos de histórico para símbolos novos")
+    parser.add_argument("--every-hours", type=float, default=0, help="Repete a ingestão a cada N horas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    tickers = list(args.tickers or [])
+    if args.tickers_file:
+        with open(args.tickers_file, 'r', encoding='utf-8') as f:
+            tickers.extend(line.strip() for line in f if line.strip())
+
+    while True:
+        started = time.monotonic()
+        total = run_ingestion_job(tickers=tickers or None, years=args.years)
+        print(f"Ingestion complete: {total} bars in {time.monotonic() - started:.1f}s.")
+        if not args.every_hours:
+            break
+        time.sleep(args.every_hours * 3600)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Settings exige estas variáveis; os testes não acessam Postgres nem Redis
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
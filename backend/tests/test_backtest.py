@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from app.services.backtest import rebalance_rows, replay, top_n_weights
+
+DATES = np.array(["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02", "2024-03-01"], dtype="datetime64[D]")
+# Ativo A, ativo B
+CLOSE = np.array([
+    [10.0, 20.0],
+    [11.0, 20.0],
+    [12.0, 10.0],
+    [6.0, 20.0],
+    [6.0, 30.0],
+])
+
+
+def test_rebalance_rows_first_bar_of_each_period():
+    assert rebalance_rows(DATES, 1).tolist() == [0, 2, 4]
+    # Trimestres: jan-mar é um único período
+    assert rebalance_rows(DATES, 3).tolist() == [0]
+
+
+def test_top_n_weights_equal_weights_over_best_eligible():
+    scores = np.array([
+        [5.0, 7.0, 7.0, 1.0],
+        [5.0, 7.0, 7.0, 9.0],
+        [5.0, 7.0, 7.0, 9.0],
+    ])
+    eligible = np.array([
+        [True, True, True, False],
+        [False, True, False, True],
+        [False, False, False, False],
+    ])
+    weights = top_n_weights(scores, eligible, top_n=2)
+    # Empate mantém a ordem do universo; inelegíveis nunca entram
+    assert weights.tolist() == [
+        [0.0, 0.5, 0.5, 0.0],
+        [0.0, 0.5, 0.0, 0.5],
+        [0.0, 0.0, 0.0, 0.0],
+    ]
+
+
+def test_replay_matches_hand_computed_curve():
+    rows = np.array([0, 2, 4])
+    # Só A, depois só B, depois metade de cada
+    weights = np.array([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+    equity, turnover = replay(CLOSE, rows, weights, cost=0.0)
+
+    # A: 10 -> 11 -> 12 (x1.2); B: 10 -> 20 -> 30 (x3)
+    assert equity == pytest.approx([1.0, 1.1, 1.2, 2.4, 3.6])
+    assert turnover == pytest.approx([0.5, 1.0, 0.5])
+
+
+def test_replay_charges_costs_on_traded_weight():
+    rows = np.array([0, 2, 4])
+    weights = np.array([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+    equity, _ = replay(CLOSE, rows, weights, cost=0.01)
+
+    # Negociado em cada rebalanceamento: 1, 2 e 1 (soma dos |pesos|)
+    c0, c1, c2 = 0.99, 0.98, 0.99
+    assert equity == pytest.approx([
+        c0, 1.1 * c0, 1.2 * c0 * c1, 2.4 * c0 * c1, 3.6 * c0 * c1 * c2,
+    ])
+
+
+def test_replay_stays_in_cash_without_holdings():
+    rows = np.array([0, 2, 4])
+    weights = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 0.0]])
+    equity, _ = replay(CLOSE, rows, weights, cost=0.0)
+
+    # Caixa até fev; A cai de 12 para 6 e o caixa volta em mar
+    assert equity == pytest.approx([1.0, 1.0, 1.0, 0.5, 0.5])
@@ -0,0 +1,115 @@
+import asyncio
+import httpx
+import pytest
+from app.services.http_client import http_pool
+from app.services.investidor10_service import Investidor10Service
+from app.services import ranking as ranking_module
+from app.services.ranking import RankingIndex, RankingService, provider_fundamentals
+from app.services.screening import FundamentalsUniverse
+from app.services.scoring_profiles import DEFAULT_PROFILE, PROFILES
+from app.services.status_invest_service import StatusInvestService
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    def serve(payload):
+        async def get(url, params=None, provider=None):
+            return httpx.Response(200, json=payload)
+
+        monkeypatch.setattr(http_pool, "get", get)
+
+    return serve
+
+
+def test_investidor10_sub_percent_values_are_fractions(upstream):
+    upstream({"peRatio": 8.5, "dividendYield": 0.8, "roe": -0.5})
+    payload = asyncio.run(Investidor10Service.get_stock_data.uncached("ABCD3"))
+
+    assert payload["dividend_yield"] == pytest.approx(0.008)
+    assert payload["roe"] == pytest.approx(-0.005)
+    assert provider_fundamentals(payload) == pytest.approx({"pl": 8.5, "roe": -0.005, "dy": 0.008})
+
+
+def test_status_invest_sub_percent_values_are_fractions(upstream):
+    upstream({"pe": 12.0, "dy": 0.35, "roe": 0.9})
+    payload = asyncio.run(StatusInvestService.get_stock_data.uncached("ABCD3"))
+
+    assert provider_fundamentals(payload) == pytest.approx({"pl": 12.0, "roe": 0.009, "dy": 0.0035})
+
+
+def test_status_invest_fii_yield_is_a_fraction(upstream):
+    upstream({"price": 10.0, "dy": 0.95})
+    payload = asyncio.run(StatusInvestService.get_fii_data.uncached("MXRF11"))
+
+    assert provider_fundamentals(payload) == pytest.approx({"dy": 0.0095})
+
+
+def test_missing_fields_are_skipped():
+    assert provider_fundamentals({"pe_ratio": None, "roe": "n/a", "dividend_yield": 0.05}) == {"dy": 0.05}
+
+
+@pytest.fixture
+def ranking(monkeypatch):
+    # Pesos padrão: 20 / P/L + 80 * ROE
+    assets = [
+        {"ticker": "AAAA3", "setor": "Bancos", "pl": 10.0, "roe": 0.5},
+        {"ticker": "DDDD3", "setor": "Bancos", "pl": 10.0, "roe": 0.25},
+        {"ticker": "CCCC3", "setor": "Bancos", "pl": 20.0, "roe": 0.25},
+        {"ticker": "BBBB3", "setor": "Bancos", "pl": 10.0, "roe": 0.25},
+    ]
+    monkeypatch.setattr(ranking_module, "get_universe", lambda: FundamentalsUniverse(assets))
+    service = RankingService({DEFAULT_PROFILE: PROFILES[DEFAULT_PROFILE]})
+    monkeypatch.setattr(ranking_module, "ranking_service", service)
+    return service
+
+
+def order(service, n=10):
+    return [(row["ticker"], row["score"]) for row in service.top(n)]
+
+
+def test_rebuild_orders_equal_scores_by_ticker(ranking):
+    assert order(ranking) == [("AAAA3", 42), ("BBBB3", 22), ("DDDD3", 22), ("CCCC3", 21)]
+    assert ranking.rank("DDDD3") == 3
+    assert ranking.rank("ZZZZ3") is None
+
+
+def test_apply_moves_ticker_past_neighbours(ranking):
+    ranking.build()
+    assert asyncio.run(ranking.apply("CCCC3", {"roe": 0.5})) == [DEFAULT_PROFILE]
+
+    assert ranking.rank("CCCC3") == 2
+    assert ranking.rank("BBBB3") == 3
+    assert order(ranking, 2) == [("AAAA3", 42), ("CCCC3", 41)]
+
+
+def test_unchanged_score_does_not_move(ranking):
+    ranking.build()
+    index = ranking.indexes[DEFAULT_PROFILE]
+    assert index.update("BBBB3", 22.0) is False
+    # P/L muda, mas o score arredondado continua 21
+    assert asyncio.run(ranking.apply("CCCC3", {"pl": 20.5})) == []
+    assert asyncio.run(ranking.apply("CCCC3", {"pl": 20.5})) == []
+    assert ranking.rank("CCCC3") == 4
+
+
+def test_index_update_keeps_keys_sorted():
+    index = RankingIndex()
+    index.rebuild([("AAAA3", 3.0), ("BBBB3", 2.0), ("CCCC3", 1.0)])
+
+    assert index.update("CCCC3", 2.0) is True
+    assert index.top(3) == [("AAAA3", 3.0), ("BBBB3", 2.0), ("CCCC3", 2.0)]
+    assert index.update("AAAA3", 0.0) is True
+    assert index.top(2, offset=1) == [("CCCC3", 2.0), ("AAAA3", 0.0)]
+    assert index.rank("AAAA3") == 2
+    assert index.update("DDDD3", 5.0) is True
+    assert index.rank("DDDD3") == 0
+
+
+def test_provider_update_rescores_ticker(ranking):
+    ranking.build()
+    asyncio.run(ranking_module.on_provider_update(
+        "investidor10:stock:CCCC3", {"ticker": "cccc3.SA", "pe_ratio": 10.0, "roe": 0.6},
+    ))
+
+    assert ranking.rank("CCCC3") == 1
+    assert order(ranking, 1) == [("CCCC3", 50)]
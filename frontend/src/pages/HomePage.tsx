@@ -6,6 +6,9 @@ import { FaChartPie, FaStar, FaRegStar, FaHandHoldingUsd, FaChartLine } from 're
 
 const API_BASE = 'http://localhost:8000/api/v1';
 
+// O backend indexa as cotações pelo ticker normalizado (maiúsculo, sem .SA)
+const normalizeTicker = (ticker: string) => ticker.trim().toUpperCase().replace('.SA', '');
+
 interface Asset {
   t: string;
   tipo: string;
@@ -49,20 +52,22 @@ const HomePage: React.FC = () => {
 
   const loadQuotes = async () => {
     setLoading(true);
-    const newQuotes: Record<string, QuoteData> = {};
-    
-    for (const asset of popularAssets.slice(0, 6)) {
-      try {
-        const res = await fetch(`${API_BASE}/symbols/quote/${asset.t}`);
-        if (res.ok) {
-          const data = await res.json();
-          newQuotes[asset.t] = data;
-        }
-      } catch (e) {
-        console.error(`Erro ao carregar ${asset.t}`);
+    let newQuotes: Record<string, QuoteData> = {};
+
+    try {
+      const res = await fetch(`${API_BASE}/symbols/quotes`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ tickers: popularAssets.slice(0, 6).map(asset => asset.t) }),
+      });
+      if (res.ok) {
+        const data = await res.json();
+        newQuotes = data.quotes;
       }
+    } catch (e) {
+      console.error('Erro ao carregar cotações');
     }
-    
+
     setQuotes(newQuotes);
     setLoading(false);
   };
@@ -120,7 +125,7 @@ const HomePage: React.FC = () => {
         ) : (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
             {popularAssets.slice(0, 6).map(asset => {
-              const quote = quotes[asset.t];
+              const quote = quotes[normalizeTicker(asset.t)];
               const isFav = favorites.includes(asset.t);
               return (
                 <div key={asset.t} className="border border-primary-200 rounded-lg p-4 hover:shadow-md transition">
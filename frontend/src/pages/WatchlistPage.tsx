@@ -6,6 +6,9 @@ import { FaStar, FaTrashAlt, FaChartLine, FaDollarSign } from 'react-icons/fa';
 
 const API_BASE = 'http://localhost:8000/api/v1';
 
+// O backend indexa as cotações pelo ticker normalizado (maiúsculo, sem .SA)
+const normalizeTicker = (ticker: string) => ticker.trim().toUpperCase().replace('.SA', '');
+
 interface FavoriteAsset {
   t: string;
   tipo: string;
@@ -28,6 +31,24 @@ const WatchlistPage: React.FC = () => {
     loadFavorites();
   }, []);
 
+  // Preços ao vivo: o servidor envia só as mudanças dos tickers assinados
+  useEffect(() => {
+    if (favorites.length === 0) return;
+    const ws = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/symbols/ws`);
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ action: 'subscribe', tickers: favorites.map(f => f.t) }));
+    };
+    ws.onmessage = (event) => {
+      const msg = JSON.parse(event.data);
+      if (msg.type !== 'quote') return;
+      setQuotes(prev => ({
+        ...prev,
+        [msg.ticker]: { ...prev[msg.ticker], ticker: msg.ticker, price: msg.price, change_percent: msg.change_percent },
+      }));
+    };
+    return () => ws.close();
+  }, [favorites]);
+
   const loadFavorites = async () => {
     setLoading(true);
     const stored = localStorage.getItem('favorites');
@@ -41,16 +62,20 @@ const WatchlistPage: React.FC = () => {
       setFavorites(assets);
       
       // Carregar cotações
-      const newQuotes: Record<string, QuoteData> = {};
-      for (const asset of assets) {
+      let newQuotes: Record<string, QuoteData> = {};
+      if (assets.length > 0) {
         try {
-          const res = await fetch(`${API_BASE}/symbols/quote/${asset.t}`);
+          const res = await fetch(`${API_BASE}/symbols/quotes`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ tickers: assets.map(asset => asset.t) }),
+          });
           if (res.ok) {
             const data = await res.json();
-            newQuotes[asset.t] = data;
+            newQuotes = data.quotes;
           }
         } catch (e) {
-          console.error(`Erro ao carregar ${asset.t}`);
+          console.error('Erro ao carregar cotações');
         }
       }
       setQuotes(newQuotes);
@@ -104,7 +129,7 @@ const WatchlistPage: React.FC = () => {
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
           {favorites.map(asset => {
-            const quote = quotes[asset.t];
+            const quote = quotes[normalizeTicker(asset.t)];
             return (
               <Card key={asset.t} className="relative">
                 <div className="flex justify-between items-start mb-3">